@@ -0,0 +1,77 @@
+"""
+Offline embedding benchmark over the rows of a CSV file.
+
+Embeds every row with the chosen provider through the same batching pipeline
+used at ingest, then queries with half of each sampled row's fields and reports
+how often the row itself is the nearest neighbour.
+
+Run from the backend directory:
+    python -m benchmarks.embedding_benchmark --csv uploaded_files/csv_files/google_maps_restaurants/google_maps_restaurants.csv --provider hashing
+"""
+import argparse
+import random
+import time
+import numpy as np
+import pandas as pd
+from rich import print as rprint
+from config import ingest_var
+from db.tabular.postgres_utilities import format_row_as_text
+from llm_core.langgraph.utilities.embedding_utils import get_embedder
+from llm_core.langgraph.utilities.embedding_pipeline import rebatch, write_embedding_batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding throughput and self-retrieval recall")
+    parser.add_argument("--csv", required=True, help="CSV file whose rows are embedded")
+    parser.add_argument("--provider", default=None, help="Embedding provider, defaults to EMBEDDING_PROVIDER")
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200, help="Rows sampled as queries")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, dtype=str).fillna("")
+    columns = list(df.columns)
+    rows = list(df.itertuples(index=False, name=None))
+    texts = [format_row_as_text(columns, row) for row in rows]
+    embedder = get_embedder(args.dimensions, args.provider)
+
+    vectors = {}
+
+    def write_batch(batch):
+        for (index, _), vector in zip(batch, embedder.embed_documents([text for _, text in batch])):
+            vectors[index] = vector
+
+    stats = write_embedding_batches(
+        rebatch([list(enumerate(texts))], ingest_var.embedding_batch_size),
+        write_batch=write_batch,
+        text_of=lambda item: item[1],
+        label=f"{args.provider or 'configured'} embeddings",
+    )
+    matrix = np.array([vectors[index] for index in range(len(texts))], dtype=np.float32)
+
+    # Query with a random half of each sampled row's fields
+    rng = random.Random(args.seed)
+    sample = rng.sample(range(len(rows)), min(args.queries, len(rows)))
+    queries = []
+    for index in sample:
+        fields = rng.sample(range(len(columns)), max(1, len(columns) // 2))
+        queries.append(format_row_as_text([columns[i] for i in fields], [rows[index][i] for i in fields]))
+
+    start = time.monotonic()
+    query_matrix = np.array(embedder.embed_documents(queries), dtype=np.float32)
+    top_match = (query_matrix @ matrix.T).argmax(axis=1)
+    query_elapsed = time.monotonic() - start
+    recall = float(np.mean(top_match == np.array(sample)))
+
+    rprint({
+        "rows": stats["rows"],
+        "rows_per_second": round(stats["rows_per_second"], 1),
+        "tokens_per_second": round(stats["tokens_per_second"], 1),
+        "queries": len(sample),
+        "query_ms_avg": round(query_elapsed / max(1, len(sample)) * 1000, 2),
+        "recall_at_1": round(recall, 3),
+    })
+
+
+if __name__ == "__main__":
+    main()
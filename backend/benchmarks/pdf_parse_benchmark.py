@@ -0,0 +1,54 @@
+"""
+Serial against parallel PDF parsing.
+
+Parses the PDF with the single-pass serial parser and with the process pool
+at each worker count, checks that the finalized chunks are identical and
+reports the timings.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_parse_benchmark uploaded_files/pdf_files/<name>/<file>.pdf --workers 2 4 8
+"""
+import time
+import argparse
+import pymupdf
+from rich import print as rprint
+from services.pdf_document_formatter import (parse_and_chunk_pdf_document, parse_and_chunk_pdf_parallel,
+                                             finalize_chunk_metadata, shutdown_parse_pool)
+
+
+def chunk_signature(chunks):
+    return [(chunk.page_content, sorted(chunk.metadata.items(), key=lambda item: item[0])) for chunk in chunks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial against parallel PDF parsing")
+    parser.add_argument("file_path")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--shard-pages", type=int, default=None, help="Pages per task, defaults to PDF_PARSE_SHARD_PAGES")
+    args = parser.parse_args()
+
+    with pymupdf.open(args.file_path, filetype="pdf") as pdf_file:
+        pages = list(range(len(pdf_file)))
+        start = time.monotonic()
+        serial = finalize_chunk_metadata(parse_and_chunk_pdf_document(pdf_file, args.file_path, pages))
+        serial_seconds = time.monotonic() - start
+    expected = chunk_signature(serial)
+    rprint({"mode": "serial", "pages": len(pages), "chunks": len(serial), "seconds": round(serial_seconds, 2)})
+
+    for workers in args.workers:
+        # Workers start on first use, so the timing includes process start-up as at ingest
+        start = time.monotonic()
+        parallel = finalize_chunk_metadata(parse_and_chunk_pdf_parallel(args.file_path, pages, workers, args.shard_pages))
+        seconds = time.monotonic() - start
+        rprint({
+            "mode": f"parallel x{workers}",
+            "chunks": len(parallel),
+            "seconds": round(seconds, 2),
+            "speedup": round(serial_seconds / seconds, 2) if seconds else None,
+            "identical": chunk_signature(parallel) == expected,
+        })
+    shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
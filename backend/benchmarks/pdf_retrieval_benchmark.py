@@ -0,0 +1,116 @@
+"""
+Latency of document-scoped chunk search against corpus size.
+
+Grows a synthetic corpus of Chunk nodes (documentName "__bench_<n>") in the pdf_lines
+vector index, where every document holds noisy copies of the same topic vectors, like
+revisions of one manual. At each size it times, for queries aimed at the first document:
+
+- unscoped:   top-1 of the shared vector index (what retrieval did before)
+- postfilter: PDF_RETRIEVAL_CANDIDATES nearest from the index, filtered by documentName
+- prefilter:  exact cosine search over the target document's chunks
+
+and reports how often the result belongs to the target document.
+The synthetic nodes are deleted afterwards; run it against a development database.
+
+Run from the backend directory:
+    python -m benchmarks.pdf_retrieval_benchmark --chunks-per-doc 200 --sizes 1000 10000 50000
+"""
+import time
+import argparse
+import statistics
+import numpy as np
+from rich import print as rprint
+from config import neo4j_var, ingest_var
+from db.document.neo4j_retrieval import VECTOR_INDEX_NAME
+
+BENCH_PREFIX = "__bench_"
+DIMENSIONS = 512
+
+unscoped_query = """
+CALL db.index.vector.queryNodes($index, 1, $embedding) YIELD node, score
+RETURN node.documentName AS documentName
+"""
+
+postfilter_query = """
+CALL db.index.vector.queryNodes($index, $candidates, $embedding) YIELD node, score
+WITH node, score WHERE node.documentName = $documentName
+RETURN node.documentName AS documentName ORDER BY score DESC LIMIT 1
+"""
+
+prefilter_query = """
+MATCH (node:Chunk {documentName: $documentName}) WHERE node.textEmbedding IS NOT NULL
+WITH node, vector.similarity.cosine(node.textEmbedding, $embedding) AS score
+RETURN node.documentName AS documentName ORDER BY score DESC LIMIT 1
+"""
+
+insert_query = """
+UNWIND $rows AS row
+CREATE (chk:Chunk {blockId: row.blockId, documentName: row.documentName, chunkText: ''})
+WITH chk, row
+CALL db.create.setNodeVectorProperty(chk, "textEmbedding", row.embedding)
+"""
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def add_documents(session, rng, topics, first_doc, count, noise):
+    for doc in range(first_doc, first_doc + count):
+        vectors = normalize(topics + rng.normal(scale=noise, size=topics.shape))
+        rows = [{"blockId": f"{BENCH_PREFIX}{doc}-{i}", "documentName": f"{BENCH_PREFIX}{doc}", "embedding": vector.tolist()}
+                for i, vector in enumerate(vectors)]
+        session.execute_write(lambda tx: tx.run(insert_query, rows=rows).consume())
+
+
+def time_queries(session, query, queries, **params):
+    latencies, hits = [], 0
+    for embedding in queries:
+        start = time.monotonic()
+        record = session.run(query, embedding=embedding, **params).single()
+        latencies.append((time.monotonic() - start) * 1000)
+        hits += int(record is not None and record["documentName"] == f"{BENCH_PREFIX}0")
+    return {"p50_ms": round(statistics.median(latencies), 2), "target_hit_rate": round(hits / len(queries), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document-scoped chunk search against corpus size")
+    parser.add_argument("--chunks-per-doc", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Total synthetic chunks")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    topics = normalize(rng.normal(size=(args.chunks_per_doc, DIMENSIONS)))
+    picks = rng.choice(args.chunks_per_doc, size=args.queries)
+    queries = normalize(topics[picks] + rng.normal(scale=args.noise, size=(args.queries, DIMENSIONS))).tolist()
+    common = {"index": VECTOR_INDEX_NAME, "documentName": f"{BENCH_PREFIX}0"}
+
+    with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+        try:
+            docs = 0
+            for size in sorted(args.sizes):
+                target_docs = max(1, size // args.chunks_per_doc)
+                add_documents(session, rng, topics, docs, target_docs - docs, args.noise)
+                docs = max(docs, target_docs)
+                session.run("CALL db.awaitIndexes(300)").consume()
+
+                rprint({
+                    "chunks": docs * args.chunks_per_doc,
+                    "documents": docs,
+                    "unscoped": time_queries(session, unscoped_query, queries, **common),
+                    "postfilter": time_queries(session, postfilter_query, queries, candidates=ingest_var.pdf_retrieval_candidates, **common),
+                    "prefilter": time_queries(session, prefilter_query, queries, **common),
+                })
+        finally:
+            session.run("""
+                MATCH (chk:Chunk) WHERE chk.documentName STARTS WITH $prefix
+                CALL { WITH chk DETACH DELETE chk } IN TRANSACTIONS OF 5000 ROWS
+                """, prefix=BENCH_PREFIX).consume()
+    neo4j_var.close_driver()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Recall against latency of a table's ANN index.
+
+Uses stored row embeddings as queries (no embedding calls), takes the exact
+top-k from a full scan as ground truth and sweeps the search parameter of the
+collection's index (hnsw.ef_search or ivfflat.probes).
+
+Run from the backend directory:
+    python -m benchmarks.vector_index_benchmark <table_name> --queries 100 --k 10 --sweep 10 20 40 80 160
+"""
+import json
+import time
+import argparse
+import statistics
+from rich import print as rprint
+from config import postgres_var, ingest_var
+from db.tabular.vector_index import (EMBEDDING_TABLE, ROW_EMBEDDING_DIMENSIONS, collection_name_for,
+                                     embedding_expression, get_collection_uuid, search_vector_index)
+
+
+def sample_query_embeddings(collection_uuid: str, count: int) -> list[list[float]]:
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {embedding_expression(ROW_EMBEDDING_DIMENSIONS)}::text
+            FROM {EMBEDDING_TABLE}
+            WHERE collection_id = %s::uuid
+            ORDER BY random()
+            LIMIT %s;
+        """, (collection_uuid, count))
+        return [json.loads(row[0]) for row in cur.fetchall()]
+
+
+def timed_search(collection_name: str, queries: list, k: int, **search_kwargs) -> tuple[list[set], list[float]]:
+    results, latencies = [], []
+    for embedding in queries:
+        start = time.monotonic()
+        docs = search_vector_index(collection_name, embedding, k, **search_kwargs)
+        latencies.append((time.monotonic() - start) * 1000)
+        results.append({doc.id for doc, _ in docs})
+    return results, latencies
+
+
+def summarize(label: str, latencies: list[float], recall: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "setting": label,
+        "recall_at_k": round(recall, 3),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall against latency of a table's ANN index")
+    parser.add_argument("table_name")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sweep", type=int, nargs="+", default=[10, 20, 40, 80, 160],
+                        help="hnsw.ef_search (or ivfflat.probes with --ivfflat) values to try")
+    parser.add_argument("--ivfflat", action="store_true", help="Sweep ivfflat.probes instead of hnsw.ef_search")
+    args = parser.parse_args()
+
+    collection_name = collection_name_for(args.table_name)
+    collection_uuid = get_collection_uuid(collection_name)
+    if collection_uuid is None:
+        parser.error(f"no embeddings found for table {args.table_name}")
+
+    queries = sample_query_embeddings(collection_uuid, args.queries)
+    exact, exact_latencies = timed_search(collection_name, queries, args.k, exact=True)
+    report = [summarize("exact scan", exact_latencies, 1.0)]
+
+    for value in args.sweep:
+        search_kwargs = {"probes": value} if args.ivfflat else {"ef_search": value}
+        found, latencies = timed_search(collection_name, queries, args.k, **search_kwargs)
+        recall = statistics.mean(len(hits & truth) / max(1, len(truth)) for hits, truth in zip(found, exact))
+        report.append(summarize(f"{'probes' if args.ivfflat else 'ef_search'}={value}", latencies, recall))
+
+    rprint(f"{args.table_name}: {len(queries)} queries, k={args.k}, index type {ingest_var.vector_index_type}")
+    for row in report:
+        rprint(row)
+    postgres_var.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 from db.tabular.postgres_config import LoadPostgresConfig
 from db.document.neo4j_config import LoadNeo4jConfig
-from llm_core.llm_config import LoadOpenAIConfig
+from llm_core.llm_config import LoadOpenAIConfig, LoadEmbeddingConfig
+from services.ingest_config import LoadIngestConfig
 
 
 openai_var  = LoadOpenAIConfig()
+embedding_var = LoadEmbeddingConfig()
 postgres_var = LoadPostgresConfig()
-neo4j_var = LoadNeo4jConfig()
\ No newline at end of file
+neo4j_var = LoadNeo4jConfig()
+ingest_var = LoadIngestConfig()
\ No newline at end of file
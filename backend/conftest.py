@@ -0,0 +1 @@
+# Lets tests import backend modules the way main.py does
@@ -0,0 +1,118 @@
+from collections import defaultdict
+from llm_core.langgraph.utilities.embedding_utils import count_tokens
+
+
+def consecutive_pairs(items: list) -> list[dict]:
+    """Returns {from, to} rows linking each item to the next one"""
+    return [{"from": first, "to": second} for first, second in zip(items, items[1:])]
+
+
+def build_section_rows(pdf_obj) -> list[dict]:
+    """
+    Materializes each section's retrieval payload: its distinct chunk texts joined in
+    reading order, the sorted page numbers it spans and the token count of the text.
+    """
+    section_texts = defaultdict(dict)
+    section_page_numbers = defaultdict(set)
+    for doc in pdf_obj:
+        section_texts[doc.metadata['source']][doc.page_content] = True
+        section_page_numbers[doc.metadata['source']].add(doc.metadata['page_number'])
+
+    rows = []
+    for section_name, texts in section_texts.items():
+        section_text = " ".join(texts)
+        rows.append({
+            "sectionName": section_name,
+            "sectionText": section_text,
+            "pageNumbers": sorted(section_page_numbers[section_name]),
+            "tokenCount": count_tokens(section_text),
+        })
+    return rows
+
+
+def build_document_graph(pdf_obj) -> dict:
+    """
+    Computes the knowledge graph of a chunked PDF in memory from the metadata set by
+    finalize_chunk_metadata, as UNWIND rows per node and relationship type.
+
+    - chapters:   Chapter nodes, linked from the Document.
+    - pages:      Page nodes with the chapters whose blocks appear on them (HAS_PAGE).
+    - sections:   Section nodes with the pages they appear on (HAS_SECTION) and
+                  their materialized text, page numbers and token count.
+    - paragraphs: Paragraph nodes, linked from their Section (HAS_PARAGRAPH).
+    - chunks:     Chunk nodes with their token count, linked from their Paragraph (HAS_CHUNK).
+    - next_pages / next_paragraphs / next_chunks: NEXT_* links in reading order,
+      pages by page number, paragraphs within a section, chunks within a paragraph.
+    """
+    chapters = {}
+    pages = {}
+    page_chapters = defaultdict(dict)
+    sections = {}
+    section_pages = defaultdict(dict)
+    paragraphs = {}
+    paragraph_chunks = defaultdict(list)
+    chunks = []
+
+    for doc in pdf_obj:
+        meta = doc.metadata
+        chapter_name = meta['chapter_name']
+        page_id = meta['page_id']
+        section_name = meta['source']
+        paragraph = {
+            "pageNumber": meta['page_number'],
+            "pageId": page_id,
+            "sectionName": section_name,
+            "sectionParagraphNumber": meta['section_block_number'],
+        }
+        paragraph_key = (page_id, section_name, meta['section_block_number'])
+
+        # dicts keep first-seen order and double as ordered sets
+        chapters.setdefault(chapter_name, {"chapterName": chapter_name})
+        pages.setdefault(page_id, {"pageNumber": meta['page_number'], "pageId": page_id})
+        page_chapters[page_id][chapter_name] = True
+        sections.setdefault(section_name, {"sectionName": section_name})
+        section_pages[section_name][page_id] = True
+        paragraphs.setdefault(paragraph_key, paragraph)
+
+        chunk = {
+            **paragraph,
+            "blockId": meta['block_id'],
+            "chunkSeqIndex": meta['chunk_seq_index'],
+            "chunkText": doc.page_content,
+            "tokenCount": count_tokens(doc.page_content),
+        }
+        chunks.append(chunk)
+        paragraph_chunks[paragraph_key].append(chunk)
+
+    for page_id, page in pages.items():
+        page["chapterNames"] = list(page_chapters[page_id])
+    for section_name, section in sections.items():
+        section["pageIds"] = list(section_pages[section_name])
+    for section_row in build_section_rows(pdf_obj):
+        sections[section_row["sectionName"]].update(section_row)
+
+    ordered_pages = sorted(pages.values(), key=lambda page: page["pageNumber"])
+
+    section_paragraphs = defaultdict(list)
+    for paragraph in paragraphs.values():
+        section_paragraphs[paragraph["sectionName"]].append(paragraph)
+    next_paragraphs = []
+    for section_paragraph_list in section_paragraphs.values():
+        ordered = sorted(section_paragraph_list, key=lambda para: (para["sectionParagraphNumber"], para["pageNumber"]))
+        next_paragraphs.extend(consecutive_pairs(ordered))
+
+    next_chunks = []
+    for chunk_list in paragraph_chunks.values():
+        ordered = sorted(chunk_list, key=lambda chunk: chunk["chunkSeqIndex"])
+        next_chunks.extend(consecutive_pairs([chunk["blockId"] for chunk in ordered]))
+
+    return {
+        "chapters": list(chapters.values()),
+        "pages": ordered_pages,
+        "sections": list(sections.values()),
+        "paragraphs": list(paragraphs.values()),
+        "chunks": chunks,
+        "next_pages": consecutive_pairs([page["pageId"] for page in ordered_pages]),
+        "next_paragraphs": next_paragraphs,
+        "next_chunks": next_chunks,
+    }
@@ -1,5 +1,7 @@
 import os
+import threading
 from dotenv import load_dotenv
+from neo4j import GraphDatabase, Driver
 from langchain_neo4j import Neo4jGraph
 
 load_dotenv()
@@ -17,6 +19,8 @@ class LoadNeo4jConfig:
         self.neo4j_user = os.getenv('NEO4J_USERNAME')
         self.neo4j_password = os.getenv('NEO4J_PASSWORD')
         self.neo4j_db = os.getenv('NEO4J_DATABASE')
+        self._driver = None
+        self._driver_lock = threading.Lock()
 
     def get_neo4j_connection(self):
         """
@@ -26,6 +30,25 @@ class LoadNeo4jConfig:
             url=self.neo4j_uri, username=self.neo4j_user, password=self.neo4j_password, database=self.neo4j_db
         )
     
+    def get_driver(self) -> Driver:
+        """
+        Returns the shared Neo4j driver used for explicit write transactions, creating it on first use.
+        """
+        if self._driver is None:
+            with self._driver_lock:
+                if self._driver is None:
+                    self._driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+        return self._driver
+
+    def close_driver(self):
+        """
+        Closes the shared Neo4j driver.
+        """
+        with self._driver_lock:
+            if self._driver is not None:
+                self._driver.close()
+                self._driver = None
+
     def get_uri(self):
         """Returns the Neo4j connection URI."""
         return self.neo4j_uri
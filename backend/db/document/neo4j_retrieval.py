@@ -1,53 +1,64 @@
+import re
+import copy
+from typing import Any, List
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
 from langchain_community.vectorstores import Neo4jVector
-from llm_core.langgraph.utilities.embedding_utils import get_embedder
-from config import neo4j_var
+from llm_core.langgraph.utilities.embedding_utils import get_embedder, count_tokens
+from utilities.store_registry import StoreRegistry
+from config import neo4j_var, ingest_var
 
 
 VECTOR_INDEX_NAME = "pdf_lines"
 VECTOR_SOURCE_PROPERTY = 'text'
 
+# One connected, validated store per index; per-PDF retrievers share its driver
+pdf_vector_stores = StoreRegistry("pdf vector stores", on_evict=lambda store: store._driver.close())
+pdf_retrievers = StoreRegistry("pdf retrievers")
 
-def build_retrieval_query(pdf_file_name):
+
+def build_retrieval_query():
     """
     Builds a Cypher query to retrieve the most relevant section of a document 
     based on a similarity score.
 
+    - Keeps only candidate chunks of the selected document ($documentName).
     - Finds the closest matching chunk (`node`) and its paragraph and section.
-    - Collects all sibling paragraphs and chunks from the same section.
-    - Joins all chunk texts into a single section response.
-    - Extracts unique page numbers from the section.
+    - Reads the section text and page numbers materialized on the Section at ingest.
+    - Sections ingested before that are still aggregated from their chunks.
 
     Returns the full section text, match score, matched paragraph, 
-    and metadata including section name and page numbers.
+    and metadata including section name, page numbers and token count.
     """
     return f"""
         WITH node, score AS closestScore
+        WHERE node.documentName = $documentName
+        WITH node, closestScore
         ORDER BY closestScore DESC
         LIMIT 1
 
         // Get section name
         MATCH (node)<-[:HAS_CHUNK]-(closestParagraph:Paragraph)<-[:HAS_PARAGRAPH]-(sec:Section)
-        // Get all paragrahs and chunks from section
-        MATCH (sec)-[:HAS_PARAGRAPH]->(siblingParagraph:Paragraph)-[:HAS_CHUNK]->(siblingChunk:Chunk)
 
-        WITH
-            node,
-            closestParagraph,
-            closestScore,
-            sec.sectionName AS sectionName,
-            collect(DISTINCT siblingParagraph) AS allParagraphs,
-            collect(DISTINCT siblingChunk.chunkText) AS fullSectionChunks
+        // Only sections without materialized text walk their paragraphs and chunks
+        CALL {{
+            WITH sec
+            OPTIONAL MATCH (sec)-[:HAS_PARAGRAPH]->(siblingParagraph:Paragraph)-[:HAS_CHUNK]->(siblingChunk:Chunk)
+            WHERE sec.sectionText IS NULL
+            RETURN
+                collect(DISTINCT siblingChunk.chunkText) AS fullSectionChunks,
+                apoc.convert.toSet(collect(siblingParagraph.pageNumber)) AS aggregatedPageNumbers
+        }}
 
-        // create a pageNumbers list from each paragraph’s pageNumber
         WITH
             node,
             closestParagraph,
             closestScore,
-            sectionName,
-            // extract pageNumber from each paragraph in allParagraphs
-            apoc.convert.toSet([p in allParagraphs WHERE p.pageNumber IS NOT NULL | p.pageNumber]) AS pageNumbers,
-            // build section response from all chunk texts
-            apoc.text.join(fullSectionChunks, ' ') AS sectionResponse
+            sec.sectionName AS sectionName,
+            sec.tokenCount AS tokenCount,
+            coalesce(sec.pageNumbers, aggregatedPageNumbers) AS pageNumbers,
+            coalesce(sec.sectionText, apoc.text.join(fullSectionChunks, ' ')) AS sectionResponse
 
         RETURN
           sectionResponse AS text,
@@ -57,14 +68,123 @@ def build_retrieval_query(pdf_file_name):
             closestText: node.text,
             sectionName: sectionName,
             pageNumbers: pageNumbers,
+            tokenCount: tokenCount,
             source: sectionName
           }} AS metadata
     """
 
 
-def kg_retrieval_window(file_name):
-    """Retriever window for Neo4j knowledge graph."""
-    vector_store_window = Neo4jVector.from_existing_index(
+# Window mode: the vector search only returns the matched chunk, the window query then
+# reads the chunks of the paragraphs around it in reading order
+window_match_query = """
+        WITH node, score
+        WHERE node.documentName = $documentName
+        WITH node, score
+        ORDER BY score DESC
+        LIMIT 1
+        RETURN node.chunkText AS text, score, {chunkId: elementId(node)} AS metadata
+"""
+
+
+def build_window_query(paragraph_radius):
+    """
+    Builds a Cypher query returning the chunks of the matched chunk's paragraph and of up to
+    paragraph_radius paragraphs either side along NEXT_PARAGRAPH, ordered by
+    (paragraph offset, chunkSeqIndex), with their precomputed token counts.
+    """
+    return f"""
+        MATCH (chk:Chunk) WHERE elementId(chk) = $chunkId
+        MATCH (chk)<-[:HAS_CHUNK]-(para:Paragraph)
+        OPTIONAL MATCH before = (:Paragraph)-[:NEXT_PARAGRAPH*1..{paragraph_radius}]->(para)
+        WITH chk, para, [path IN collect(before) | {{offset: -length(path), paragraph: nodes(path)[0]}}] AS befores
+        OPTIONAL MATCH after = (para)-[:NEXT_PARAGRAPH*1..{paragraph_radius}]->(:Paragraph)
+        WITH chk, para, befores, [path IN collect(after) | {{offset: length(path), paragraph: last(nodes(path))}}] AS afters
+        UNWIND befores + [{{offset: 0, paragraph: para}}] + afters AS entry
+        WITH chk, entry.offset AS paragraphOffset, entry.paragraph AS paragraph
+        MATCH (paragraph)-[:HAS_CHUNK]->(neighbour:Chunk)
+        RETURN
+            paragraphOffset,
+            neighbour.chunkSeqIndex AS chunkSeqIndex,
+            neighbour.chunkText AS text,
+            neighbour.tokenCount AS tokenCount,
+            paragraph.pageNumber AS pageNumber,
+            paragraph.sectionName AS sectionName,
+            neighbour = chk AS matched
+        ORDER BY paragraphOffset, chunkSeqIndex
+    """
+
+
+def select_token_window(chunks: list[dict], token_budget: int) -> list[dict]:
+    """
+    Grows a window outward from the matched chunk, alternating the next and the previous
+    chunk in reading order, while the token budget allows. The matched chunk is always kept.
+    """
+    matched = next((i for i, chunk in enumerate(chunks) if chunk["matched"]), None)
+    if matched is None:
+        return []
+
+    def tokens(chunk):
+        return chunk["tokenCount"] if chunk["tokenCount"] is not None else count_tokens(chunk["text"])
+
+    used = tokens(chunks[matched])
+    left, right = matched - 1, matched + 1
+    while left >= 0 or right < len(chunks):
+        grew = False
+        if right < len(chunks) and used + tokens(chunks[right]) <= token_budget:
+            used += tokens(chunks[right])
+            right += 1
+            grew = True
+        if left >= 0 and used + tokens(chunks[left]) <= token_budget:
+            used += tokens(chunks[left])
+            left -= 1
+            grew = True
+        if not grew:
+            break
+    return chunks[left + 1:right]
+
+
+class WindowedKGRetriever(BaseRetriever):
+    """
+    Retriever returning the matched chunk plus the chunks of the neighbouring paragraphs
+    along NEXT_PARAGRAPH, in chunkSeqIndex order, up to a token budget,
+    instead of the whole matched section.
+    """
+    vector_store: Any
+    search_kwargs: dict
+    token_budget: int
+    paragraph_radius: int
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        hits = self.vector_store.similarity_search(query, **self.search_kwargs)
+        return [self.expand(hit) for hit in hits[:1]]
+
+    def expand(self, hit: Document) -> Document:
+        with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+            chunks = session.execute_read(
+                lambda tx: tx.run(build_window_query(self.paragraph_radius), chunkId=hit.metadata["chunkId"]).data()
+            )
+        window = select_token_window(chunks, self.token_budget)
+        if not window:
+            window = [{"text": hit.page_content, "pageNumber": None, "sectionName": None, "tokenCount": None, "matched": True}]
+        section_name = next((chunk["sectionName"] for chunk in window if chunk["matched"]), None)
+        return Document(
+            page_content=" ".join(chunk["text"] for chunk in window),
+            metadata={
+                "closestText": hit.page_content,
+                "sectionName": section_name,
+                "pageNumbers": sorted({chunk["pageNumber"] for chunk in window if chunk["pageNumber"] is not None}),
+                "tokenCount": sum(chunk["tokenCount"] or count_tokens(chunk["text"]) for chunk in window),
+                "source": section_name,
+            },
+        )
+
+
+def get_pdf_vector_store():
+    """
+    Returns the shared Neo4jVector store of the chunk index.
+    from_existing_index connects and validates the index, so it runs once per process.
+    """
+    return pdf_vector_stores.get_or_create(VECTOR_INDEX_NAME, lambda: Neo4jVector.from_existing_index(
         embedding=get_embedder(512),
         url=neo4j_var.neo4j_uri,
         username=neo4j_var.neo4j_user,
@@ -72,8 +192,45 @@ def kg_retrieval_window(file_name):
         database=neo4j_var.neo4j_db,
         index_name=VECTOR_INDEX_NAME,
         text_node_property=VECTOR_SOURCE_PROPERTY,
-        retrieval_query= build_retrieval_query(file_name)
-    )
-    retriever_window = vector_store_window.as_retriever(
-    )
-    return retriever_window
+    ))
+
+
+def document_search_kwargs(file_name):
+    """
+    Search arguments that restrict retrieval to one document.
+
+    - prefilter: exact cosine search over the document's own chunks (found through the
+      Chunk.documentName index), so other documents never compete. Needs Neo4j 5.18+.
+    - postfilter: PDF_RETRIEVAL_CANDIDATES nearest chunks from the shared vector index,
+      then the retrieval query drops those of other documents.
+    """
+    search_kwargs = {"params": {"documentName": file_name}}
+    if ingest_var.pdf_retrieval_filter == "postfilter":
+        search_kwargs["k"] = ingest_var.pdf_retrieval_candidates
+    else:
+        search_kwargs["k"] = 1
+        search_kwargs["filter"] = {"documentName": file_name}
+    return search_kwargs
+
+
+def kg_retrieval_window(file_name):
+    """Retriever window for Neo4j knowledge graph, scoped to one document and cached per PDF."""
+    def build_retriever():
+        vector_store_window = copy.copy(get_pdf_vector_store())
+        if ingest_var.pdf_context_mode == "window":
+            vector_store_window.retrieval_query = window_match_query
+            return WindowedKGRetriever(
+                vector_store=vector_store_window,
+                search_kwargs=document_search_kwargs(file_name),
+                token_budget=ingest_var.pdf_context_token_budget,
+                paragraph_radius=ingest_var.pdf_context_paragraph_radius,
+            )
+        vector_store_window.retrieval_query = build_retrieval_query()
+        return vector_store_window.as_retriever(search_kwargs=document_search_kwargs(file_name))
+
+    return pdf_retrievers.get_or_create(file_name, build_retriever)
+
+
+def invalidate_pdf_retrievers(pdf_name):
+    """Drops the cached retrievers of a deleted PDF (keyed by file name, pdf_name is its sanitized form)"""
+    pdf_retrievers.invalidate_where(lambda file_name: re.sub(r'[^a-zA-Z0-9]+', '_', file_name) == pdf_name)
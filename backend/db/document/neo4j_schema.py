@@ -0,0 +1,147 @@
+"""
+Constraints and indexes for every key the PDF ingest and retrieval queries look nodes up by.
+
+Without them each MATCH/MERGE on (documentName, ...) is a label scan whose cost grows
+with every document in the database. ensure_kg_schema creates them at ingest;
+the missing-index report is served by /kg-schema-report and can be run from the backend directory:
+    python -m db.document.neo4j_schema
+"""
+import threading
+from rich import print as rprint
+from config import neo4j_var
+
+# (name, kind, label, properties); constraints are uniqueness constraints on natural ids.
+# A composite index only serves queries with a predicate on every one of its properties,
+# so the per-document lookups get their own documentName indexes.
+KG_SCHEMA = [
+    ("unique_block", "constraint", "Block", ["blockId"]),
+    ("unique_document", "constraint", "Document", ["documentName"]),
+    ("unique_chunk", "constraint", "Chunk", ["blockId"]),
+    ("block_document_name", "index", "Block", ["documentName"]),
+    ("block_document", "index", "Block", ["documentName", "pageId"]),
+    ("chapter_document_name", "index", "Chapter", ["documentName"]),
+    ("chapter_document", "index", "Chapter", ["documentName", "chapterName"]),
+    ("page_document_name", "index", "Page", ["documentName"]),
+    ("page_document", "index", "Page", ["documentName", "pageId"]),
+    ("section_document_name", "index", "Section", ["documentName"]),
+    ("section_document", "index", "Section", ["documentName", "sectionName"]),
+    ("paragraph_document_name", "index", "Paragraph", ["documentName"]),
+    ("paragraph_section", "index", "Paragraph", ["documentName", "sectionName"]),
+    ("paragraph_document", "index", "Paragraph", ["documentName", "pageId", "sectionName", "sectionParagraphNumber"]),
+    ("chunk_document", "index", "Chunk", ["documentName", "pageId", "sectionName", "sectionParagraphNumber"]),
+    ("chunk_document_name", "index", "Chunk", ["documentName"]),
+]
+
+INDEX_ONLINE_TIMEOUT = 300      # seconds to wait for new indexes to come online
+# failed holds the items that could not be created or brought online in this process
+schema_state = {"ready": False, "failed": set()}
+schema_lock = threading.Lock()
+
+
+def schema_statement(name: str, kind: str, label: str, properties: list[str]) -> str:
+    """Returns the idempotent CREATE statement of a schema item"""
+    props = ", ".join(f"n.{prop}" for prop in properties)
+    if kind == "constraint":
+        return f"CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE ({props}) IS UNIQUE"
+    return f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON ({props})"
+
+
+def ensure_kg_schema(force: bool = False) -> list[dict]:
+    """
+    Creates every constraint and index in KG_SCHEMA once per process, waits for them to
+    come online and verifies them. Returns the items that are still missing.
+    A failure (e.g. duplicates blocking a constraint) is logged, not raised,
+    since queries still work without the index. Failed items are not retried
+    until force is passed, so later ingests don't repeat the DDL and the wait.
+    """
+    with schema_lock:
+        if schema_state["ready"] and not force:
+            return []
+        if force:
+            schema_state["failed"].clear()
+
+        with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+            for name, kind, label, properties in KG_SCHEMA:
+                if name in schema_state["failed"]:
+                    continue
+                try:
+                    session.run(schema_statement(name, kind, label, properties)).consume()
+                except Exception as e:
+                    schema_state["failed"].add(name)
+                    rprint(f"Could not create {kind} {name} on :{label}({', '.join(properties)}): {str(e)}")
+            try:
+                session.run("CALL db.awaitIndexes($timeout)", timeout=INDEX_ONLINE_TIMEOUT).consume()
+            except Exception as e:
+                # a FAILED index or the timeout; the check below reports which items are affected
+                rprint(f"Knowledge graph indexes did not all come online: {str(e)}")
+
+        missing = get_missing_kg_schema()
+        for item in missing:
+            rprint(f"Knowledge graph {item['kind']} {item['name']} is {item['problem']}")
+            schema_state["failed"].add(item["name"])
+        schema_state["ready"] = True
+        return missing
+
+
+def get_missing_kg_schema() -> list[dict]:
+    """
+    Compares KG_SCHEMA with the database.
+    An item is reported when no online index covers its label and properties (in order),
+    or when a required uniqueness constraint is absent.
+    """
+    with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+        indexes = session.run("""
+            SHOW INDEXES YIELD name, type, entityType, labelsOrTypes, properties, state
+            WHERE entityType = 'NODE' AND type = 'RANGE'
+            RETURN name, labelsOrTypes, properties, state
+            """).data()
+        constraints = session.run("""
+            SHOW CONSTRAINTS YIELD name, type, labelsOrTypes, properties
+            WHERE type IN ['UNIQUENESS', 'NODE_PROPERTY_UNIQUENESS', 'NODE_KEY']
+            RETURN name, labelsOrTypes, properties
+            """).data()
+
+    online = {}
+    for index in indexes:
+        online[(index["labelsOrTypes"][0], tuple(index["properties"]))] = index["state"]
+    unique = {(constraint["labelsOrTypes"][0], tuple(constraint["properties"])) for constraint in constraints}
+
+    missing = []
+    for name, kind, label, properties in KG_SCHEMA:
+        key = (label, tuple(properties))
+        if kind == "constraint" and key not in unique:
+            problem = "missing"
+        elif key not in online:
+            problem = "missing"
+        elif online[key] != "ONLINE":
+            problem = f"not online ({online[key]})"
+        else:
+            continue
+        missing.append({
+            "name": name,
+            "kind": kind,
+            "label": label,
+            "properties": properties,
+            "problem": problem,
+            "statement": schema_statement(name, kind, label, properties),
+        })
+    return missing
+
+
+def get_kg_schema_report() -> dict:
+    """Returns the expected schema items and the ones that are missing or not online"""
+    missing = get_missing_kg_schema()
+    return {
+        "expected": len(KG_SCHEMA),
+        "missing": missing,
+        "ok": not missing,
+    }
+
+
+if __name__ == "__main__":
+    report = get_kg_schema_report()
+    if report["ok"]:
+        rprint(f"All {report['expected']} knowledge graph indexes and constraints are online")
+    for item in report["missing"]:
+        rprint(f"{item['kind']} {item['name']} on :{item['label']}({', '.join(item['properties'])}) is {item['problem']}\n    {item['statement']}")
+    neo4j_var.close_driver()
@@ -1,6 +1,12 @@
+import time
 from dotenv import load_dotenv
+from typing import Callable
 from rich import print as rprint
-from config import neo4j_var, openai_var
+from config import neo4j_var, ingest_var
+from llm_core.langgraph.utilities.embedding_utils import get_embedder, count_tokens
+from llm_core.langgraph.utilities.embedding_pipeline import rebatch, write_embedding_batches
+from db.document.kg_builder import build_document_graph, build_section_rows
+from db.document.neo4j_schema import ensure_kg_schema
 
 
 load_dotenv()
@@ -39,42 +45,54 @@ def param_insert(pdf_as_llm_doc):
 
 
 #---------------------------------------------------------------------------------------
-merge_block_node_query = """
-MERGE (mergedBlock:Block {blockId: $chunkParam.blockId})
+merge_block_nodes_query = """
+UNWIND $rows AS chunkParam
+MERGE (mergedBlock:Block {blockId: chunkParam.blockId})
     ON CREATE SET
-        mergedBlock.section = $chunkParam.section,
-        mergedBlock.documentName = $chunkParam.documentName,
-        mergedBlock.documentParagraphNumber = $chunkParam.documentParagraphNumber,
-        mergedBlock.sectionParagraphNumber = $chunkParam.sectionParagraphNumber,
-        mergedBlock.isHeader = $chunkParam.isHeader,
-        mergedBlock.pageNumber = $chunkParam.pageNumber,
-        mergedBlock.hasImages = $chunkParam.hasImages,
-        mergedBlock.pageCount = $chunkParam.pageCount,
-        mergedBlock.chapterName = $chunkParam.chapterName,
-        mergedBlock.chapterNumber = $chunkParam.chapterNumber,
-        mergedBlock.pageId = $chunkParam.pageId,
-        mergedBlock.chunkSeqIndex = $chunkParam.chunkSeqIndex,
-        mergedBlock.text = $chunkParam.text
-RETURN mergedBlock
+        mergedBlock.section = chunkParam.section,
+        mergedBlock.documentName = chunkParam.documentName,
+        mergedBlock.documentParagraphNumber = chunkParam.documentParagraphNumber,
+        mergedBlock.sectionParagraphNumber = chunkParam.sectionParagraphNumber,
+        mergedBlock.isHeader = chunkParam.isHeader,
+        mergedBlock.pageNumber = chunkParam.pageNumber,
+        mergedBlock.hasImages = chunkParam.hasImages,
+        mergedBlock.pageCount = chunkParam.pageCount,
+        mergedBlock.chapterName = chunkParam.chapterName,
+        mergedBlock.chapterNumber = chunkParam.chapterNumber,
+        mergedBlock.pageId = chunkParam.pageId,
+        mergedBlock.chunkSeqIndex = chunkParam.chunkSeqIndex,
+        mergedBlock.text = chunkParam.text
 """
 
 
-def create_block_constraints():
-    """Create constraints for Block nodes"""
-    kg.query("""
-        CREATE CONSTRAINT unique_block IF NOT EXISTS 
-            FOR (b:Block) REQUIRE b.blockId IS UNIQUE
-        """)
+def write_rows_in_batches(query: str, rows: list, label: str, batch_size: int = None, **params) -> dict:
+    """
+    Runs an UNWIND $rows query over rows in batches of NEO4J_WRITE_BATCH_SIZE,
+    each batch in its own explicit write transaction (retried by the driver on transient errors).
+    Returns throughput metrics.
+    """
+    batch_size = batch_size or ingest_var.neo4j_write_batch_size
+    stats = {"rows": 0, "batches": 0}
+    start = time.monotonic()
+
+    with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+        for i in range(0, len(rows), batch_size):
+            batch = rows[i:i + batch_size]
+            session.execute_write(lambda tx: tx.run(query, rows=batch, **params).consume())
+            stats["rows"] += len(batch)
+            stats["batches"] += 1
+
+    elapsed = time.monotonic() - start
+    stats["elapsed"] = elapsed
+    stats["rows_per_second"] = stats["rows"] / elapsed if elapsed else 0.0
+    rprint(f"{label}: {stats['rows']} rows in {stats['batches']} transactions, {elapsed:.2f}s ({stats['rows_per_second']:.1f} rows/s)")
+    return stats
 
 
 def add_block_as_node(pdf_obj):
-    """Add each block as node with metadata"""
-    node_count = 0
-    for line in pdf_obj:
-        params = param_insert(line)
-        kg.query(merge_block_node_query, 
-                params=params)
-        node_count += 1
+    """Add each block as node with metadata, in batched UNWIND writes"""
+    rows = [param_insert(line)['chunkParam'] for line in pdf_obj]
+    return write_rows_in_batches(merge_block_nodes_query, rows, label="Block nodes")
 
 
 def create_document(pdf_name):
@@ -154,13 +172,25 @@ def create_sections_paragraph(pdf_name):
 
 
 def create_chunks(pdf_name):
-    """Create chunks from Block nodes"""
+    """
+    Create chunks from Block nodes.
+    Chunks are merged on their unique blockId; a chunk whose text changed loses its embedding
+    so create_chunk_embeddings embeds it again.
+    """
 
     cypher = """
         MATCH (b:Block)
         WHERE b.documentName = $fileName
         WITH DISTINCT b.documentName AS documentName, b.pageNumber AS pageNumber, b.pageId AS pageId, b.section AS sectionName, b.sectionParagraphNumber AS sectionParagraphNumber, b.chunkSeqIndex AS chunkSeqIndex, b.blockId AS blockId, b.text AS chunkText
-        MERGE (b:Chunk {  blockId: blockId,  documentName: documentName, pageNumber: pageNumber, pageId: pageId, sectionName: sectionName, sectionParagraphNumber: sectionParagraphNumber, chunkSeqIndex: chunkSeqIndex, chunkText: chunkText})
+        MERGE (b:Chunk { blockId: blockId })
+        FOREACH (_ IN CASE WHEN b.chunkText <> chunkText THEN [1] ELSE [] END | REMOVE b.textEmbedding)
+        SET b.documentName = documentName,
+            b.pageNumber = pageNumber,
+            b.pageId = pageId,
+            b.sectionName = sectionName,
+            b.sectionParagraphNumber = sectionParagraphNumber,
+            b.chunkSeqIndex = chunkSeqIndex,
+            b.chunkText = chunkText
         RETURN b
         """
 
@@ -286,6 +316,164 @@ def link_next_chunks(pdf_name):
     kg.query(cypher, params={'fileName': pdf_name})
 
 
+#---------------------------------------------------------------------------------------
+# Bulk graph build: nodes and relationships computed by build_document_graph,
+# written as one UNWIND statement per node or relationship type
+bulk_chapters_query = """
+MERGE (doc:Document {documentName: $documentName})
+WITH doc
+UNWIND $rows AS row
+MERGE (ch:Chapter {documentName: $documentName, chapterName: row.chapterName})
+MERGE (doc)-[:HAS_CHAPTER]->(ch)
+"""
+
+bulk_pages_query = """
+UNWIND $rows AS row
+MERGE (pg:Page {documentName: $documentName, pageNumber: row.pageNumber, pageId: row.pageId})
+WITH pg, row
+UNWIND row.chapterNames AS chapterName
+MATCH (ch:Chapter {documentName: $documentName, chapterName: chapterName})
+MERGE (ch)-[:HAS_PAGE]->(pg)
+"""
+
+bulk_sections_query = """
+UNWIND $rows AS row
+MERGE (sec:Section {documentName: $documentName, sectionName: row.sectionName})
+SET sec.sectionText = row.sectionText,
+    sec.pageNumbers = row.pageNumbers,
+    sec.tokenCount = row.tokenCount
+WITH sec, row
+UNWIND row.pageIds AS pageId
+MATCH (pg:Page {documentName: $documentName, pageId: pageId})
+MERGE (pg)-[:HAS_SECTION]->(sec)
+"""
+
+bulk_paragraphs_query = """
+UNWIND $rows AS row
+MATCH (sec:Section {documentName: $documentName, sectionName: row.sectionName})
+MERGE (para:Paragraph {documentName: $documentName, pageNumber: row.pageNumber, pageId: row.pageId, sectionName: row.sectionName, sectionParagraphNumber: row.sectionParagraphNumber})
+MERGE (sec)-[:HAS_PARAGRAPH]->(para)
+"""
+
+bulk_chunks_query = """
+UNWIND $rows AS row
+MATCH (para:Paragraph {documentName: $documentName, pageId: row.pageId, sectionName: row.sectionName, sectionParagraphNumber: row.sectionParagraphNumber})
+MERGE (chk:Chunk {blockId: row.blockId})
+// A chunk whose text changed loses its embedding, so create_chunk_embeddings embeds it again
+FOREACH (_ IN CASE WHEN chk.chunkText <> row.chunkText THEN [1] ELSE [] END | REMOVE chk.textEmbedding)
+SET chk.documentName = $documentName,
+    chk.pageNumber = row.pageNumber,
+    chk.pageId = row.pageId,
+    chk.sectionName = row.sectionName,
+    chk.sectionParagraphNumber = row.sectionParagraphNumber,
+    chk.chunkSeqIndex = row.chunkSeqIndex,
+    chk.chunkText = row.chunkText,
+    chk.tokenCount = row.tokenCount
+MERGE (para)-[:HAS_CHUNK]->(chk)
+"""
+
+bulk_next_pages_query = """
+UNWIND $rows AS row
+MATCH (a:Page {documentName: $documentName, pageId: row.from})
+MATCH (b:Page {documentName: $documentName, pageId: row.to})
+MERGE (a)-[:NEXT_PAGE]->(b)
+"""
+
+bulk_next_paragraphs_query = """
+UNWIND $rows AS row
+MATCH (a:Paragraph {documentName: $documentName, pageId: row.from.pageId, sectionName: row.from.sectionName, sectionParagraphNumber: row.from.sectionParagraphNumber})
+MATCH (b:Paragraph {documentName: $documentName, pageId: row.to.pageId, sectionName: row.to.sectionName, sectionParagraphNumber: row.to.sectionParagraphNumber})
+MERGE (a)-[:NEXT_PARAGRAPH]->(b)
+"""
+
+bulk_next_chunks_query = """
+UNWIND $rows AS row
+MATCH (a:Chunk {blockId: row.from})
+MATCH (b:Chunk {blockId: row.to})
+MERGE (a)-[:NEXT_CHUNK]->(b)
+"""
+
+
+materialize_sections_query = """
+UNWIND $rows AS row
+MATCH (sec:Section {documentName: $documentName, sectionName: row.sectionName})
+SET sec.sectionText = row.sectionText,
+    sec.pageNumbers = row.pageNumbers,
+    sec.tokenCount = row.tokenCount
+"""
+
+
+materialize_chunk_tokens_query = """
+UNWIND $rows AS row
+MATCH (chk:Chunk {blockId: row.blockId})
+SET chk.tokenCount = row.tokenCount
+"""
+
+
+def materialize_sections(pdf_obj) -> dict:
+    """
+    Stores each section's joined text, page numbers and token count on its Section node,
+    so retrieval reads one property instead of aggregating the section's chunks per question.
+    Also stores each chunk's token count for the windowed context mode.
+    The bulk build sets these while writing the graph; the legacy passes need this extra step.
+    """
+    if not pdf_obj:
+        return {}
+    chunk_rows = [{"blockId": doc.metadata['block_id'], "tokenCount": count_tokens(doc.page_content)} for doc in pdf_obj]
+    write_rows_in_batches(materialize_chunk_tokens_query, chunk_rows, label="Chunk token counts")
+    return write_rows_in_batches(materialize_sections_query, build_section_rows(pdf_obj),
+                                 label="Section text", documentName=pdf_obj[0].metadata['pdf_file_name'])
+
+
+def write_document_graph(pdf_obj) -> dict:
+    """
+    Builds the Document/Chapter/Page/Section/Paragraph/Chunk graph in memory and
+    writes it with one batched UNWIND statement per node or relationship type.
+    Parents are written before children, so each statement only matches nodes of this document.
+    Returns throughput metrics per statement.
+    """
+    if not pdf_obj:
+        return {}
+    document_name = pdf_obj[0].metadata['pdf_file_name']
+    graph = build_document_graph(pdf_obj)
+
+    statements = [
+        ("chapters", bulk_chapters_query),
+        ("pages", bulk_pages_query),
+        ("sections", bulk_sections_query),
+        ("paragraphs", bulk_paragraphs_query),
+        ("chunks", bulk_chunks_query),
+        ("next_pages", bulk_next_pages_query),
+        ("next_paragraphs", bulk_next_paragraphs_query),
+        ("next_chunks", bulk_next_chunks_query),
+    ]
+    return {
+        name: write_rows_in_batches(query, graph[name], label=f"Graph {name}", documentName=document_name)
+        for name, query in statements
+    }
+
+
+def link_document_graph(pdf_name):
+    """
+    Legacy graph build: derives every entity from the Block nodes in sequential Cypher passes.
+    """
+    create_document(pdf_name)
+    create_chapters(pdf_name)
+    create_pages(pdf_name)
+    create_sections(pdf_name)
+    create_sections_paragraph(pdf_name)
+    create_chunks(pdf_name)
+
+    link_document_to_chapters(pdf_name)
+    link_chapters_to_pages(pdf_name)
+    link_pages_to_sections(pdf_name)
+    link_sections_to_paragraphs(pdf_name)
+    link_paragraphs_to_chunks(pdf_name)
+    link_next_pages(pdf_name)
+    link_next_paragraphs(pdf_name)
+    link_next_chunks(pdf_name)
+
+
 def create_vector_index():
     """Create vector index for chunk nodes"""
     try:
@@ -305,55 +493,154 @@ def create_vector_index():
         rprint(f"Query failed: {str(e)}")
 
 
-def create_chunk_embeddings():
-    """Create embeddings for Chunk nodes"""
-    cypher = """
-            MATCH (chk:Chunk) WHERE chk.textEmbedding IS NULL
-            WITH chk, genai.vector.encode(
-            chk.chunkText, 
-            "OpenAI", 
-            {
-                token: $openAiApiKey, 
-                endpoint: $openAiEndpoint,
-                model: $model,
-                dimensions: 512
-            }) AS vector
-            CALL db.create.setNodeVectorProperty(chk, "textEmbedding", vector)
-            """
-    kg.query(cypher, 
-        params={
-            "openAiApiKey": openai_var.openai_api_key,
-            "openAiEndpoint": openai_var.openai_endpoint,
-            "model" : openai_var.openai_embedding_modal_small,
-        })
+set_chunk_embeddings_query = """
+UNWIND $rows AS row
+MATCH (chk:Chunk) WHERE elementId(chk) = row.id
+CALL db.create.setNodeVectorProperty(chk, "textEmbedding", row.embedding)
+"""
+
+
+def create_chunk_embeddings(document_name) -> dict:
+    """
+    Create embeddings for the Chunk nodes of one document through the (cached) embedder.
+
+    Only chunks without an embedding are fetched, so rerunning after a failure resumes
+    where it stopped. Chunks are embedded in batches of EMBEDDING_BATCH_SIZE with bounded
+    concurrency and retries, and each batch is written back in its own transaction.
+    Returns throughput metrics.
+    """
+    chunks = kg.query("""
+            MATCH (chk:Chunk {documentName: $documentName}) WHERE chk.textEmbedding IS NULL
+            RETURN elementId(chk) AS id, chk.chunkText AS text
+            ORDER BY chk.blockId
+            """,
+            params={"documentName": document_name})
+    embedder = get_embedder(512)
+
+    def write_batch(batch):
+        vectors = embedder.embed_documents([chunk["text"] for chunk in batch])
+        rows = [{"id": chunk["id"], "embedding": vector} for chunk, vector in zip(batch, vectors)]
+        with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+            session.execute_write(lambda tx: tx.run(set_chunk_embeddings_query, rows=rows).consume())
+
+    stats = write_embedding_batches(
+        rebatch([chunks], ingest_var.embedding_batch_size),
+        write_batch=write_batch,
+        text_of=lambda chunk: chunk["text"],
+        label=f"Chunk embeddings for {document_name}",
+    )
     kg.refresh_schema()
+    return stats
 
 
     
-def process_pdf_to_kg(pdf_obj, pdf_name):
+#---------------------------------------------------------------------------------------
+# Incremental re-ingest: Page nodes keep a content hash and their parsed chunks,
+# so a revised PDF only re-parses and re-embeds the pages that changed
+store_page_sources_query = """
+UNWIND $rows AS row
+MERGE (pg:Page {documentName: $documentName, pageNumber: row.pageNumber, pageId: row.pageId})
+SET pg.contentHash = row.contentHash,
+    pg.rawChunks = row.rawChunks
+"""
+
+# Structure derived from the whole document, rebuilt on every re-ingest
+REINGEST_REBUILT_LABELS = ["Block", "Chapter", "Page", "Section", "Paragraph"]
+
+
+def get_stored_page_hashes(document_name) -> dict:
+    """Returns {pageNumber: contentHash} of the document's pages that have stored chunks"""
+    with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+        records = session.run("""
+            MATCH (pg:Page {documentName: $documentName})
+            WHERE pg.contentHash IS NOT NULL AND pg.rawChunks IS NOT NULL
+            RETURN pg.pageNumber AS pageNumber, pg.contentHash AS contentHash
+            """, documentName=document_name).data()
+    return {record["pageNumber"]: record["contentHash"] for record in records}
+
+
+def load_stored_page_chunks(document_name, page_numbers) -> dict:
+    """Returns {pageNumber: serialized chunks} stored on the given pages"""
+    with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+        records = session.run("""
+            MATCH (pg:Page {documentName: $documentName})
+            WHERE pg.pageNumber IN $pageNumbers
+            RETURN pg.pageNumber AS pageNumber, pg.rawChunks AS rawChunks
+            """, documentName=document_name, pageNumbers=page_numbers).data()
+    return {record["pageNumber"]: record["rawChunks"] for record in records}
+
+
+def prune_document_for_reingest(document_name, kept_page_numbers) -> None:
+    """
+    Deletes the Chunk nodes of every page not in kept_page_numbers (changed or removed pages)
+    and all of the document's Block, Chapter, Page, Section and Paragraph nodes.
+    Chunks of unchanged pages keep their blockId and embedding, and are relinked by the graph build.
+    """
+    with neo4j_var.get_driver().session(database=neo4j_var.neo4j_db) as session:
+        session.run("""
+            MATCH (chk:Chunk {documentName: $documentName})
+            WHERE chk.pageNumber IS NULL OR NOT chk.pageNumber IN $keptPageNumbers
+            CALL { WITH chk DETACH DELETE chk } IN TRANSACTIONS OF 5000 ROWS
+            """, documentName=document_name, keptPageNumbers=kept_page_numbers).consume()
+        for label in REINGEST_REBUILT_LABELS:
+            session.run(f"""
+                MATCH (n:{label} {{documentName: $documentName}})
+                CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF 5000 ROWS
+                """, documentName=document_name).consume()
+
+
+def store_page_sources(document_name, page_hashes: dict, page_chunks: dict) -> dict:
+    """
+    Stores every page's content hash and serialized chunks on its Page node.
+    Pages without chunks (blank or image-only) get a Page node with an empty chunk list,
+    so they count as unchanged on the next re-ingest.
+    """
+    rows = [
+        {
+            "pageNumber": page_number,
+            "pageId": f"{document_name}-{page_number}",
+            "contentHash": page_hash,
+            "rawChunks": page_chunks.get(page_number, "[]"),
+        }
+        for page_number, page_hash in page_hashes.items()
+    ]
+    return write_rows_in_batches(store_page_sources_query, rows, label="Page sources", documentName=document_name)
+
+
+def process_pdf_to_kg(pdf_obj, pdf_name, report_progress: Callable[[str], None] = lambda stage: None,
+                      kept_page_numbers: list = None, page_sources: tuple = None):
+    """
+    Writes a finalized, chunked PDF to the knowledge graph and embeds its new chunks.
+    With kept_page_numbers, the document is first pruned for an incremental re-ingest.
+    page_sources is a (page hashes, serialized page chunks) pair stored on the Page nodes last,
+    so an interrupted ingest is fully re-parsed next time.
+    """
+    # Chunk nodes carry the name parsed from the file, which can differ from the sanitized pdf_name
+    document_name = pdf_obj[0].metadata['pdf_file_name'] if pdf_obj else pdf_name
     try:
+        ensure_kg_schema()
+        if kept_page_numbers is not None:
+            prune_document_for_reingest(document_name, kept_page_numbers)
+
         # Insert blocks that make up the document
         # Blocks contain metadata to create entities
-        create_block_constraints()
         add_block_as_node(pdf_obj)
-        create_document(pdf_name)
-        create_chapters(pdf_name)
-        create_pages(pdf_name)
-        create_sections(pdf_name)
-        create_sections_paragraph(pdf_name)
-        create_chunks(pdf_name)
-        
-        link_document_to_chapters(pdf_name)
-        link_chapters_to_pages(pdf_name)
-        link_pages_to_sections(pdf_name)
-        link_sections_to_paragraphs(pdf_name)
-        link_paragraphs_to_chunks(pdf_name)
-        link_next_pages(pdf_name)
-        link_next_paragraphs(pdf_name)
-        link_next_chunks(pdf_name)
+        report_progress("loaded")
+
+        if ingest_var.kg_build_mode == "cypher":
+            link_document_graph(pdf_name)
+            materialize_sections(pdf_obj)
+        else:
+            write_document_graph(pdf_obj)
+        report_progress("graph-linked")
 
         create_vector_index()
-        create_chunk_embeddings()
+        create_chunk_embeddings(document_name)
+        report_progress("embedded")
+
+        if page_sources is not None:
+            store_page_sources(document_name, *page_sources)
 
     except Exception as e:
-        rprint(f"Query failed: {str(e)}")
\ No newline at end of file
+        rprint(f"Query failed: {str(e)}")
+        raise
@@ -0,0 +1,228 @@
+"""
+Registry of uploaded files: one row per ingested CSV table or PDF, written during ingestion.
+
+Listing and lookups are one indexed query each, cached in process until the next registry
+write. On first use the table is created and backfilled from tables tagged with the
+older 'source_type: ...' table comments.
+"""
+import os
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager
+from config import postgres_var
+from utilities.store_registry import StoreRegistry
+
+FILE_REGISTRY_TABLE = "file_registry"
+
+registry_state = {"ready": False}
+registry_lock = threading.Lock()
+
+# ("list", file_type) -> registered files, ("file", name) -> one registered file
+registered_files = StoreRegistry("registered files", max_entries=1024)
+
+create_file_registry_query = f"""
+    CREATE TABLE IF NOT EXISTS {FILE_REGISTRY_TABLE} (
+        name TEXT PRIMARY KEY,
+        file_type TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        size_bytes BIGINT,
+        row_count BIGINT,
+        page_count INTEGER,
+        content_hash TEXT,
+        status TEXT NOT NULL DEFAULT 'ingesting',
+        reingest_status TEXT,
+        error TEXT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        ingested_at TIMESTAMPTZ
+    );
+    CREATE INDEX IF NOT EXISTS {FILE_REGISTRY_TABLE}_type_status ON {FILE_REGISTRY_TABLE} (file_type, status, name);
+"""
+
+commented_tables_query = """
+    SELECT c.relname, substring(d.description FROM 'source_type: (\\w+)')
+    FROM pg_class c
+    JOIN pg_description d ON c.oid = d.objoid AND d.objsubid = 0
+    WHERE c.relkind = 'r'
+    AND c.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
+    AND d.description IN ('source_type: csv', 'source_type: pdf');
+"""
+
+registered_file_columns = "name, file_type, file_name, size_bytes, row_count, page_count, content_hash, status, reingest_status, error, created_at, updated_at, ingested_at"
+
+
+def ensure_file_registry():
+    """
+    Creates the registry table once per process and backfills files ingested before it existed.
+    """
+    with registry_lock:
+        if registry_state["ready"]:
+            return
+
+        with postgres_var.connection() as conn, conn.cursor() as cur:
+            cur.execute(create_file_registry_query)
+            cur.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {FILE_REGISTRY_TABLE})")
+            if cur.fetchone()[0]:
+                backfill_file_registry(cur)
+            conn.commit()
+
+        registry_state["ready"] = True
+
+
+def backfill_file_registry(cur):
+    """Registers every table tagged by a 'source_type' comment, as ready"""
+    cur.execute(commented_tables_query)
+    for name, file_type in cur.fetchall():
+        file_name = name
+        if file_type == "pdf":
+            # PDF tables hold the uploaded file name in their first row
+            cur.execute(f"SELECT pdf_file_name FROM {name} ORDER BY id LIMIT 1")
+            row = cur.fetchone()
+            file_name = row[0] if row else name
+        cur.execute(f"""
+            INSERT INTO {FILE_REGISTRY_TABLE} (name, file_type, file_name, status, ingested_at)
+            VALUES (%s, %s, %s, 'ready', now())
+            ON CONFLICT (name) DO NOTHING;
+        """, (name, file_type, file_name))
+
+
+def file_content_hash(file_location: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_location, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def register_file(name: str, file_type: str, file_location: str):
+    """
+    Records an upload as ingesting.
+    Re-uploading a name that is ready keeps it ready (and listed) with its previous file details;
+    the re-ingest is tracked in reingest_status until it finishes.
+    """
+    ensure_file_registry()
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {FILE_REGISTRY_TABLE} (name, file_type, file_name, status)
+            VALUES (%s, %s, %s, 'ingesting')
+            ON CONFLICT (name) DO UPDATE SET
+                status = CASE WHEN {FILE_REGISTRY_TABLE}.status = 'ready' THEN 'ready' ELSE 'ingesting' END,
+                reingest_status = CASE WHEN {FILE_REGISTRY_TABLE}.status = 'ready' THEN 'ingesting' ELSE NULL END,
+                error = NULL,
+                updated_at = now();
+        """, (name, file_type, os.path.basename(file_location)))
+        conn.commit()
+    registered_files.clear()
+
+
+def complete_registered_file(name: str, file_type: str, file_location: str, row_count: int = None, page_count: int = None):
+    """
+    Marks an entry ready with the ingested file's name, size, content hash and counts.
+    """
+    ensure_file_registry()
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE {FILE_REGISTRY_TABLE} SET
+                file_type = %s,
+                file_name = %s,
+                size_bytes = %s,
+                content_hash = %s,
+                row_count = %s,
+                page_count = %s,
+                status = 'ready',
+                reingest_status = NULL,
+                error = NULL,
+                updated_at = now(),
+                ingested_at = now()
+            WHERE name = %s;
+        """, (file_type, os.path.basename(file_location), os.path.getsize(file_location), file_content_hash(file_location),
+              row_count, page_count, name))
+        conn.commit()
+    registered_files.clear()
+
+
+def fail_registered_file(name: str, error: str):
+    """
+    Records a failed ingest. An entry that was ready stays ready, since its previous
+    table or graph is still in place; only its reingest_status is failed.
+    """
+    ensure_file_registry()
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            UPDATE {FILE_REGISTRY_TABLE} SET
+                status = CASE WHEN status = 'ready' THEN 'ready' ELSE 'failed' END,
+                reingest_status = CASE WHEN status = 'ready' THEN 'failed' ELSE NULL END,
+                error = %s,
+                updated_at = now()
+            WHERE name = %s;
+        """, (error, name))
+        conn.commit()
+    registered_files.clear()
+
+
+@contextmanager
+def registered_ingest(name: str, file_type: str, file_location: str):
+    """
+    Registers an upload for the duration of its ingest and marks it ready, or failed on error.
+    Yields a dict the ingest fills with row_count or page_count.
+    """
+    register_file(name, file_type, file_location)
+    counts = {}
+    try:
+        yield counts
+    except Exception as e:
+        fail_registered_file(name, str(e))
+        raise
+    complete_registered_file(name, file_type, file_location, row_count=counts.get("row_count"), page_count=counts.get("page_count"))
+
+
+async def unregister_file(name: str):
+    """Removes a deleted file's entry"""
+    await ensure_file_registry_async()
+    async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+        await cur.execute(f"DELETE FROM {FILE_REGISTRY_TABLE} WHERE name = %s;", (name,))
+        await conn.commit()
+    registered_files.clear()
+
+
+async def ensure_file_registry_async():
+    if not registry_state["ready"]:
+        await asyncio.to_thread(ensure_file_registry)
+
+
+async def list_registered_files(file_type: str) -> list[dict]:
+    """
+    Returns the files of one type that finished ingesting, by name.
+    """
+    files = registered_files.get(("list", file_type))
+    if files is None:
+        await ensure_file_registry_async()
+        async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+            await cur.execute(f"""
+                SELECT {registered_file_columns}
+                FROM {FILE_REGISTRY_TABLE}
+                WHERE file_type = %s AND status = 'ready'
+                ORDER BY name;
+            """, (file_type,))
+            columns = [desc[0] for desc in cur.description]
+            files = [dict(zip(columns, row)) for row in await cur.fetchall()]
+        registered_files.put(("list", file_type), files)
+    return files
+
+
+async def get_registered_file(name: str) -> dict:
+    """
+    Returns one registry entry, None if the name is not registered.
+    """
+    file = registered_files.get(("file", name))
+    if file is None:
+        await ensure_file_registry_async()
+        async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+            await cur.execute(f"SELECT {registered_file_columns} FROM {FILE_REGISTRY_TABLE} WHERE name = %s;", (name,))
+            row = await cur.fetchone()
+            if row is None:
+                return None
+            file = dict(zip([desc[0] for desc in cur.description], row))
+        registered_files.put(("file", name), file)
+    return file
@@ -1,23 +1,26 @@
 from fastapi import HTTPException, UploadFile
 import re
 import os
-from services.pdf_document_formatter import parse_and_chunk_pdf, finalize_chunk_metadata
-from  db.document.neo4j_utility import process_pdf_to_kg
+from typing import Callable
+from services.pdf_document_formatter import (parse_and_chunk_pdf, finalize_chunk_metadata, page_content_hashes,
+                                             serialize_page_chunks, deserialize_page_chunks)
+from  db.document.neo4j_utility import process_pdf_to_kg, get_stored_page_hashes, load_stored_page_chunks
+from utilities.os_re_tools import get_name_from_path
+from db.tabular.file_registry import registered_ingest
+from rich import print as rprint
 import shutil
 import pymupdf
-from config import postgres_var
+from config import postgres_var, ingest_var
 
-    
-def ingest_pdf_into_postgres(file: UploadFile):
+
+def handle_pdf_upload(file: UploadFile) -> tuple[str, str]:
     """
-    Ingests a PDF file's path into a PostgreSQL table as TEXT.
+    Upload PDF to server and return (pdf_name, file_location)
     """
-    
     file_name = file.filename
     file_load = file.file
 
     pdf_name = re.sub(r'\.pdf$', '', file_name)
-    file_name_minus_extension = pdf_name
     pdf_name = re.sub(r'[^a-zA-Z0-9]+', '_', pdf_name)
 
     pdf_upload_dir = f"./uploaded_files/pdf_files/{pdf_name}"
@@ -31,48 +34,87 @@ def ingest_pdf_into_postgres(file: UploadFile):
     with open(file_location, "wb") as buffer:
         shutil.copyfileobj(file_load, buffer)
 
-    complete_path = pdf_upload_dir + "/" + file_name
-
-    pdf_file = pymupdf.open(complete_path, filetype="pdf")
-    page_nums = None
-    pdf_obj = parse_and_chunk_pdf(pdf_file, complete_path, page_nums)
-    pdf_obj = finalize_chunk_metadata(pdf_obj)
-    process_pdf_to_kg(pdf_obj, pdf_name)
-
-
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
+    return pdf_name, file_location
 
-    # Create the table with a TEXT column for storing the file path
-    create_table_query = f"""
-        CREATE TABLE IF NOT EXISTS {pdf_name} (
-            id SERIAL PRIMARY KEY,
-            pdf_file_name TEXT
-        );
+    
+def ingest_pdf_into_postgres(pdf_name: str, file_location: str, report_progress: Callable[[str], None] = lambda stage: None):
     """
-
-    try:
-        # Create table
-        cur.execute(create_table_query)
-        conn.commit()
-
-        # Add metadata to the table
-        cur.execute(f"COMMENT ON TABLE {pdf_name} IS 'source_type: pdf';")
-        conn.commit()
-
-        # Insert the file path into the table
-        insert_query = f"""
-            INSERT INTO {pdf_name} (pdf_file_name) 
-            VALUES (%s);
+    Ingests an uploaded PDF file into the Neo4j knowledge graph and stores its path in a PostgreSQL table as TEXT.
+    Calls report_progress with each completed stage.
+
+    With PDF_REINGEST_MODE=incremental (bulk graph builds), pages whose content hash matches
+    the one stored on their Page node are not re-parsed or re-embedded; their chunks are restored
+    from the graph, and nodes of changed or removed pages are replaced.
+    The upload is tracked in the file registry, which lists it once ingest completes.
+    Returns the page counts.
+    """
+    file_name = os.path.basename(file_location)
+    document_name = get_name_from_path(file_location)
+    incremental = ingest_var.pdf_reingest_mode == "incremental" and ingest_var.kg_build_mode == "bulk"
+
+    with registered_ingest(pdf_name, "pdf", file_location) as counts:
+        with pymupdf.open(file_location, filetype="pdf") as pdf_file:
+            page_hashes = page_content_hashes(pdf_file)
+            stored_hashes = get_stored_page_hashes(document_name) if incremental else {}
+            unchanged = [page_number for page_number, page_hash in page_hashes.items() if stored_hashes.get(page_number) == page_hash]
+            changed = [page_number for page_number, page_hash in page_hashes.items() if stored_hashes.get(page_number) != page_hash]
+            removed = [page_number for page_number in stored_hashes if page_number not in page_hashes]
+            # Parser page numbers are 0-based, chunk metadata page numbers 1-based
+            pdf_obj = parse_and_chunk_pdf(pdf_file, file_location, [page_number - 1 for page_number in changed]) if changed else []
+        page_counts = {"pages": len(page_hashes), "skipped": len(unchanged), "reparsed": len(changed), "removed": len(removed)}
+        counts["page_count"] = len(page_hashes)
+
+        if incremental and stored_hashes and not changed and not removed:
+            rprint(f"PDF '{file_name}' is unchanged, skipped all {len(unchanged)} pages")
+            for stage in ("parsed", "loaded", "graph-linked", "embedded"):
+                report_progress(stage)
+        else:
+            if unchanged:
+                for page_json in load_stored_page_chunks(document_name, unchanged).values():
+                    pdf_obj.extend(deserialize_page_chunks(page_json))
+                pdf_obj.sort(key=lambda chunk: chunk.metadata['page_number'])
+
+            # Serialized before finalize_chunk_metadata, which numbers blocks and sections across pages in place
+            page_sources = (page_hashes, serialize_page_chunks(pdf_obj)) if ingest_var.kg_build_mode == "bulk" else None
+            pdf_obj = finalize_chunk_metadata(pdf_obj)
+            report_progress("parsed")
+            if incremental:
+                rprint(f"PDF '{file_name}': skipped {len(unchanged)} unchanged pages, re-parsed {len(changed)}, removed {len(removed)}")
+
+            process_pdf_to_kg(pdf_obj, pdf_name, report_progress,
+                              kept_page_numbers=unchanged if incremental else None,
+                              page_sources=page_sources)
+
+
+        # Create the table with a TEXT column for storing the file path
+        create_table_query = f"""
+            CREATE TABLE IF NOT EXISTS {pdf_name} (
+                id SERIAL PRIMARY KEY,
+                pdf_file_name TEXT
+            );
         """
-        cur.execute(insert_query, (file_name,))
-        conn.commit()
-
-        print(f"PDF file '{file_name}' successfully ingested into table '{pdf_name}'.")
-    except Exception as e:
-        print(f"Error ingesting PDF data into table {pdf_name}: {str(e)}")
-        conn.rollback()
-    finally:
-        cur.close()
-        conn.close()
 
+        with postgres_var.connection() as conn, conn.cursor() as cur:
+            try:
+                # Create table
+                cur.execute(create_table_query)
+                conn.commit()
+
+                # Add metadata to the table
+                cur.execute(f"COMMENT ON TABLE {pdf_name} IS 'source_type: pdf';")
+                conn.commit()
+
+                # Insert the file path into the table
+                insert_query = f"""
+                    INSERT INTO {pdf_name} (pdf_file_name) 
+                    VALUES (%s);
+                """
+                cur.execute(insert_query, (file_name,))
+                conn.commit()
+
+                print(f"PDF file '{file_name}' successfully ingested into table '{pdf_name}'.")
+            except Exception as e:
+                print(f"Error ingesting PDF data into table {pdf_name}: {str(e)}")
+                conn.rollback()
+
+    return page_counts
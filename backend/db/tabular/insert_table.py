@@ -1,33 +1,53 @@
 from utilities.os_re_tools import remove_file_extension, create_folder_by_location, extract_table_name, save_uploaded_file
-from db.tabular.postgres_utilities import insert_csv_into_table, add_fuzzystrmatch_extension, generate_column_definitions
-from db.tabular.table_embeddings import get_docs_from_rows, create_embeddings_of_table_rows
-from config import postgres_var
+from db.tabular.postgres_utilities import insert_csv_into_table, add_fuzzystrmatch_extension, generate_column_definitions, map_dtype_to_postgres, stream_csv_into_table, clear_embedding_checkpoint
+from db.tabular.table_embeddings import create_embeddings_of_table_rows
+from db.tabular.table_counts import set_table_row_count, invalidate_table_row_count
+from db.tabular.schema_catalog import refresh_table_schema
+from db.tabular.file_registry import registered_ingest
+from db.tabular.query_cache import bump_table_data_version
+from config import postgres_var, ingest_var
 from fastapi import UploadFile
+from typing import Callable
 import pandas as pd
 
 
 
 
-def ingest_csv_into_postgres(file: UploadFile):
+def ingest_csv_into_postgres(table_name: str, file_location: str, report_progress: Callable[[str], None] = lambda stage: None):
     """
-    Ingests the CSV file into a PostgreSQL table.
+    Ingests an uploaded CSV file into a PostgreSQL table.
     This assumes the table does not exist and needs to be created.
+    Calls report_progress with each completed stage.
+    The upload is tracked in the file registry, which lists it once ingest completes.
     """
-    # upload file to server
-    table_name, file_location = handle_csv_upload(file)
-  
-    # create table with column definitions
-    column_list = create_table_from_csv(table_name, file_location)
+    with registered_ingest(table_name, "csv", file_location) as counts:
+        if ingest_var.csv_streaming_ingest:
+            # create table from a sample of rows, then stream the file into it in one pass
+            column_names, column_types = create_table_from_csv_sample(table_name, file_location, ingest_var.csv_schema_sample_rows)
+            report_progress("parsed")
+            row_count = stream_csv_into_table(table_name, file_location, column_names, column_types, ingest_var.csv_copy_batch_rows)
+            set_table_row_count(table_name, row_count)
+            counts["row_count"] = row_count
+        else:
+            # create table with column definitions
+            column_list = create_table_from_csv(table_name, file_location)
+            report_progress("parsed")
 
-    # insert data into table
-    insert_csv_into_table(table_name, file_location, column_list)
+            # insert data into table
+            insert_csv_into_table(table_name, file_location, column_list)
+            invalidate_table_row_count(table_name)
 
-    # add fuzzystrmatch extension to table
-    add_fuzzystrmatch_extension()
+        # columns are final once loaded, streaming ingest may have widened their types
+        refresh_table_schema(table_name)
+        bump_table_data_version(table_name)
 
-    # create and store embeddings in PG vector store
-    docs = get_docs_from_rows(table_name)
-    create_embeddings_of_table_rows(table_name, docs)
+        # add fuzzystrmatch extension to table
+        add_fuzzystrmatch_extension()
+        report_progress("loaded")
+
+        # stream rows in batches into embeddings stored in PG vector store
+        create_embeddings_of_table_rows(table_name)
+        report_progress("embedded")
 
 
 def handle_csv_upload(file: UploadFile) -> tuple[str, str]:
@@ -47,20 +67,41 @@ def create_table_from_csv(table_name: str, file_location: str) -> str:
     Creates a table using csv file name as table name
     Returns list of column names as string
     """
-    column_definitions, column_string = generate_column_definitions(pd.read_csv(file_location))
-
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
-    try:
-        create_table_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_definitions)});"
-        cur.execute(create_table_query)
-        cur.execute(f"COMMENT ON TABLE {table_name} IS 'source_type: csv';")
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error creating table: {str(e)}")
-    finally:
-        cur.close()
-        postgres_var.close_db_connection(conn)
+    return create_table_from_dataframe(table_name, pd.read_csv(file_location))
+
+
+def create_table_from_csv_sample(table_name: str, file_location: str, sample_rows: int) -> tuple[list[str], list[str]]:
+    """
+    Creates a table with column types inferred from the first sample_rows rows of the csv.
+    Returns (column names, postgres column types)
+    """
+    sample = pd.read_csv(file_location, nrows=sample_rows)
+    column_string = create_table_from_dataframe(table_name, sample)
+    column_types = [map_dtype_to_postgres(str(dtype)) for dtype in sample.dtypes]
+    return column_string.split(", "), column_types
+
+
+def create_table_from_dataframe(table_name: str, df: pd.DataFrame) -> str:
+    """
+    Creates a table with column definitions generated from a dataframe's dtypes
+    Returns list of column names as string
+    A newly created table starts without an embedding checkpoint, as its row ids start at 1.
+    """
+    column_definitions, column_string = generate_column_definitions(df)
+
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        try:
+            cur.execute("SELECT to_regclass(%s)", (table_name,))
+            table_existed = cur.fetchone()[0] is not None
+            create_table_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_definitions)});"
+            cur.execute(create_table_query)
+            cur.execute(f"COMMENT ON TABLE {table_name} IS 'source_type: csv';")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error creating table: {str(e)}")
+
+    if not table_existed:
+        clear_embedding_checkpoint(table_name)
 
     return column_string
@@ -1,5 +1,12 @@
 import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
 import psycopg2
+from psycopg2 import pool, extensions
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -21,6 +28,43 @@ class LoadPostgresConfig:
         self.engine = None
         self.session = None
 
+        # Connection pool settings
+        self.pool_min_size = int(os.getenv('POSTGRES_POOL_MIN_SIZE', 2))                        # idle connections kept open
+        self.pool_max_size = int(os.getenv('POSTGRES_POOL_MAX_SIZE', 10))                       # connections open at once
+        self.pool_timeout = float(os.getenv('POSTGRES_POOL_TIMEOUT', 30))                       # seconds to wait for a free connection
+        self.pool_max_lifetime = float(os.getenv('POSTGRES_POOL_MAX_LIFETIME', 1800))           # seconds before a connection is recycled
+        self.pool_health_check_after = float(os.getenv('POSTGRES_POOL_HEALTH_CHECK_AFTER', 30)) # idle seconds before checkout runs SELECT 1
+
+        # Table browsing
+        self.table_count_cache_seconds = float(os.getenv('TABLE_COUNT_CACHE_SECONDS', 300))      # seconds a table's row count is served from cache
+        self.table_exact_count_threshold = int(os.getenv('TABLE_EXACT_COUNT_THRESHOLD', 100000)) # tables estimated below this many rows are counted exactly
+
+        # Query streaming
+        self.sql_stream_max_rows = int(os.getenv('SQL_STREAM_MAX_ROWS', 100000))   # rows /sql-query/stream sends before truncating
+        self.sql_stream_fetch_size = int(os.getenv('SQL_STREAM_FETCH_SIZE', 1000))  # rows fetched from the server-side cursor at a time
+
+        # Query result cache
+        self.query_cache_ttl_seconds = float(os.getenv('QUERY_CACHE_TTL_SECONDS', 300))  # seconds a retrieval result is reused, 0 disables the cache
+        self.query_cache_max_entries = int(os.getenv('QUERY_CACHE_MAX_ENTRIES', 256))    # cached results kept before LRU eviction
+        self.query_cache_max_rows = int(os.getenv('QUERY_CACHE_MAX_ROWS', 10000))        # larger results are not cached
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._pool_slots = threading.BoundedSemaphore(self.pool_max_size)
+        self._conn_created = {}
+        self._conn_last_used = {}
+        self._async_pool = None
+        self._async_pool_lock = asyncio.Lock()
+        self._pool_stats = {
+            "checkouts": 0,
+            "in_use": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+        }
+
     def get_db_connection(self):
         """
         Establishes and returns a new database connection.
@@ -37,7 +81,7 @@ class LoadPostgresConfig:
         except psycopg2.DatabaseError as e:
             print(f"Error establishing database connection: {str(e)}")
             raise
-        
+
     def get_db_url(self):
         """
         Returns the database connection URL.
@@ -50,3 +94,206 @@ class LoadPostgresConfig:
         """
         if connection:
             connection.close()
+
+    def get_pool(self) -> pool.ThreadedConnectionPool:
+        """
+        Returns the shared connection pool, creating it on first use.
+        """
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    try:
+                        self._pool = pool.ThreadedConnectionPool(
+                            self.pool_min_size,
+                            self.pool_max_size,
+                            dbname=self.db_name,
+                            user=self.db_user,
+                            password=self.db_password,
+                            host=self.db_host,
+                            port=self.db_port
+                        )
+                    except psycopg2.DatabaseError as e:
+                        print(f"Error creating database connection pool: {str(e)}")
+                        raise
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """
+        Checks out a pooled connection for the duration of the block.
+        Rolls back on error and returns the connection to the pool on exit.
+        Callers still commit explicitly.
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._checkin(conn)
+
+    def _checkout(self):
+        """
+        Waits for a free pool slot and returns a validated connection.
+        """
+        start = time.monotonic()
+        if not self._pool_slots.acquire(timeout=self.pool_timeout):
+            with self._pool_lock:
+                self._pool_stats["timeouts"] += 1
+            raise pool.PoolError(f"Timed out after {self.pool_timeout}s waiting for a database connection")
+        waited = time.monotonic() - start
+
+        try:
+            conn = self._validate_connection(self.get_pool().getconn())
+        except Exception:
+            self._pool_slots.release()
+            raise
+
+        with self._pool_lock:
+            self._pool_stats["checkouts"] += 1
+            self._pool_stats["in_use"] += 1
+            self._pool_stats["wait_time_total"] += waited
+            self._pool_stats["wait_time_max"] = max(self._pool_stats["wait_time_max"], waited)
+        return conn
+
+    def _validate_connection(self, conn):
+        """
+        Recycles connections that are closed, older than the max lifetime,
+        or fail a health check after sitting idle.
+        """
+        now = time.monotonic()
+        created = self._conn_created.setdefault(id(conn), now)
+        last_used = self._conn_last_used.get(id(conn), now)
+
+        recycle = conn.closed or now - created > self.pool_max_lifetime
+        if not recycle and now - last_used > self.pool_health_check_after:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                recycle = True
+                with self._pool_lock:
+                    self._pool_stats["health_check_failures"] += 1
+
+        if not recycle:
+            return conn
+
+        self._forget_connection(conn)
+        self.get_pool().putconn(conn, close=True)
+        conn = self.get_pool().getconn()
+        self._conn_created.setdefault(id(conn), time.monotonic())
+        with self._pool_lock:
+            self._pool_stats["recycled"] += 1
+        return conn
+
+    def _checkin(self, conn):
+        """
+        Resets any open transaction and hands the connection back to the pool.
+        """
+        close = conn.closed != 0
+        if not close and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        if close:
+            self._forget_connection(conn)
+        else:
+            self._conn_last_used[id(conn)] = time.monotonic()
+
+        try:
+            self.get_pool().putconn(conn, close=close)
+            # The pool closes connections beyond its idle size on return
+            if conn.closed:
+                self._forget_connection(conn)
+        finally:
+            with self._pool_lock:
+                self._pool_stats["in_use"] -= 1
+            self._pool_slots.release()
+
+    def _forget_connection(self, conn):
+        """
+        Drops lifetime bookkeeping for a connection that is being closed.
+        """
+        self._conn_created.pop(id(conn), None)
+        self._conn_last_used.pop(id(conn), None)
+
+    def get_pool_stats(self) -> dict:
+        """
+        Returns pool sizing and checkout wait metrics.
+        """
+        with self._pool_lock:
+            stats = dict(self._pool_stats)
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts if checkouts else 0.0
+        stats["min_size"] = self.pool_min_size
+        stats["max_size"] = self.pool_max_size
+        return stats
+
+    def close_pool(self):
+        """
+        Closes every connection held by the pool.
+        """
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._conn_created.clear()
+                self._conn_last_used.clear()
+
+    async def get_async_pool(self) -> AsyncConnectionPool:
+        """
+        Returns the shared async connection pool, opening it on first use.
+        Uses the same sizing, timeout and lifetime settings as the sync pool.
+        """
+        if self._async_pool is None:
+            async with self._async_pool_lock:
+                if self._async_pool is None:
+                    async_pool = AsyncConnectionPool(
+                        make_conninfo(
+                            dbname=self.db_name,
+                            user=self.db_user,
+                            password=self.db_password,
+                            host=self.db_host,
+                            port=self.db_port
+                        ),
+                        min_size=self.pool_min_size,
+                        max_size=self.pool_max_size,
+                        timeout=self.pool_timeout,
+                        max_lifetime=self.pool_max_lifetime,
+                        check=AsyncConnectionPool.check_connection,
+                        open=False
+                    )
+                    await async_pool.open()
+                    self._async_pool = async_pool
+        return self._async_pool
+
+    @asynccontextmanager
+    async def async_connection(self):
+        """
+        Checks out an async pooled connection for the duration of the block.
+        The transaction is committed on a clean exit and rolled back on error.
+        """
+        async_pool = await self.get_async_pool()
+        async with async_pool.connection() as conn:
+            yield conn
+
+    def get_async_pool_stats(self) -> dict:
+        """
+        Returns the async pool's own counters (waiting requests, wait time, errors).
+        """
+        if self._async_pool is None:
+            return {}
+        return self._async_pool.get_stats()
+
+    async def close_async_pool(self):
+        """
+        Closes every connection held by the async pool.
+        """
+        if self._async_pool is not None:
+            await self._async_pool.close()
+            self._async_pool = None
@@ -1,8 +1,22 @@
 from utilities.os_re_tools import sanitize_label
 from config import postgres_var
+import csv
+import io
+from itertools import islice
+from typing import Iterator
 import pandas as pd
 from langchain_core.documents import Document
 
+# Values pandas reads as missing; loaded as NULL into non-text columns
+CSV_NULL_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                   "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+# Numeric types in widening order
+NUMERIC_TYPE_ORDER = ["INTEGER", "BIGINT", "FLOAT"]
+
+# Tracks how far row embedding got for each table, so a failed ingest can resume
+EMBEDDING_CHECKPOINT_TABLE = "table_embedding_checkpoints"
+
 
 
 def add_fuzzystrmatch_extension():
@@ -10,36 +24,131 @@ def add_fuzzystrmatch_extension():
     Adds the fuzzystrmatch extension to the database.
     Allows for fuzzy matching of strings through methods like levenshtein distance.
     """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch;")
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error adding fuzzystrmatch extension: {str(e)}")
-    finally:
-        cur.close()
-        postgres_var.close_db_connection(conn)
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS fuzzystrmatch;")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error adding fuzzystrmatch extension: {str(e)}")
 
 
 def insert_csv_into_table(table_name: str, file_location: str, column_list: str):
     """
     Inserts data from a CSV file into a PostgreSQL table.
     """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        try:
+            with open(file_location, 'r', encoding='utf-8') as f:
+                cur.copy_expert(
+                    f"COPY {table_name} ({column_list}) FROM STDIN DELIMITER ',' CSV HEADER", f)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error inserting data: {str(e)}")
+
+
+def stream_csv_into_table(table_name: str, file_location: str, column_names: list[str], column_types: list[str], batch_rows: int) -> int:
+    """
+    Streams a CSV file into a PostgreSQL table in a single pass.
+    Rows are COPYed in batches of batch_rows. Before each batch, any column whose
+    values no longer fit its inferred type is widened with ALTER TABLE.
+    Memory use depends on the batch size, not the file size.
+    Blank lines are skipped and empty fields load as NULL, quoted or not, as with pandas.
+    Returns the number of rows inserted.
+    """
+    column_types = list(column_types)
+    column_list = ", ".join(column_names)
+    row_count = 0
+
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        try:
+            with open(file_location, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)  # skip header
+                rows = (row for row in reader if row)  # blank lines read as []
+
+                while True:
+                    batch = list(islice(rows, batch_rows))
+                    if not batch:
+                        break
+
+                    widen_columns_for_batch(cur, table_name, column_names, column_types, batch)
+
+                    buffer = io.StringIO()
+                    csv.writer(buffer).writerows(batch)
+                    buffer.seek(0)
+                    # csv.writer quotes a lone empty field (""), which COPY would read as an empty string
+                    cur.copy_expert(f"COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT csv, FORCE_NULL ({column_list}))", buffer)
+                    row_count += len(batch)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise Exception(f"Error inserting data: {str(e)}")
+
+    return row_count
+
+
+def widen_columns_for_batch(cur, table_name: str, column_names: list[str], column_types: list[str], batch: list[list[str]]):
+    """
+    Widens column types so every value in the batch fits, and blanks out missing-value
+    markers (NA, null, ...) in non-text columns so COPY loads them as NULL.
+    Updates column_types and the batch in place.
+    """
+    for i, column_name in enumerate(column_names):
+        current_type = column_types[i]
+        if current_type == "TEXT":
+            continue
+
+        widened_type = current_type
+        for row in batch:
+            if i >= len(row):
+                continue
+            if row[i] in CSV_NULL_VALUES:
+                row[i] = ""
+                continue
+            widened_type = widen_postgres_type(widened_type, infer_postgres_type(row[i]))
+
+        if widened_type != current_type:
+            print(f"Widening {table_name}.{column_name} from {current_type} to {widened_type}")
+            cur.execute(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE {widened_type} USING {column_name}::{widened_type}")
+            column_types[i] = widened_type
+
+
+def infer_postgres_type(value: str) -> str:
+    """
+    Returns the narrowest PostgreSQL type that can hold a CSV value.
+    """
+    if value.lower() in ("true", "false"):
+        return "BOOLEAN"
+    if "_" in value:
+        return "TEXT"
     try:
-        with open(file_location, 'r', encoding='utf-8') as f:
-            cur.copy_expert(
-                f"COPY {table_name} ({column_list}) FROM STDIN DELIMITER ',' CSV HEADER", f)
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise Exception(f"Error inserting data: {str(e)}")
-    finally:
-        cur.close()
-        postgres_var.close_db_connection(conn)
+        number = int(value)
+        if -2**31 <= number < 2**31:
+            return "INTEGER"
+        if -2**63 <= number < 2**63:
+            return "BIGINT"
+        return "TEXT"
+    except ValueError:
+        pass
+    try:
+        float(value)
+        return "FLOAT"
+    except ValueError:
+        return "TEXT"
+
+
+def widen_postgres_type(current_type: str, value_type: str) -> str:
+    """
+    Returns the narrowest type that holds values of both types.
+    Numeric types widen INTEGER -> BIGINT -> FLOAT; anything else falls back to TEXT.
+    """
+    if current_type == value_type:
+        return current_type
+    if current_type in NUMERIC_TYPE_ORDER and value_type in NUMERIC_TYPE_ORDER:
+        return max(current_type, value_type, key=NUMERIC_TYPE_ORDER.index)
+    return "TEXT"
 
 
 def map_dtype_to_postgres(dtype: str) -> str:
@@ -73,22 +182,59 @@ def generate_column_definitions(df: pd.DataFrame) -> tuple[list, str]:
     return column_definitions, ", ".join(sanitized_columns)
 
 
-def fetch_all_rows_from_table(table_name: str) -> list[tuple]:
+def iter_rows_from_table(table_name: str, fetch_size: int, after_id: int = 0) -> Iterator[tuple[list[str], list[tuple]]]:
     """
-    Fetches all rows from a table and returns a list of tuples.
+    Streams the rows of a table with id > after_id through a named (server-side) cursor, ordered by id.
+    Yields (column names, rows) for every batch of up to fetch_size rows.
     """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(f"SELECT * FROM {table_name};")
-        return cur.fetchall()
-    except Exception as e:
-        print(f"Error fetching rows from {table_name}: {str(e)}")
-        conn.rollback()
-        return []
-    finally:
-        cur.close()
-        conn.close()
+    with postgres_var.connection() as conn, conn.cursor(name=f"{table_name}_rows") as cur:
+        cur.itersize = fetch_size
+        cur.execute(f"SELECT * FROM {table_name} WHERE id > %s ORDER BY id;", (after_id,))
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield [desc[0] for desc in cur.description], rows
+
+
+def create_embedding_checkpoint_table(cur):
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {EMBEDDING_CHECKPOINT_TABLE} (table_name TEXT PRIMARY KEY, last_row_id BIGINT NOT NULL, updated_at TIMESTAMPTZ DEFAULT now());")
+
+
+def get_embedding_checkpoint(table_name: str) -> int:
+    """
+    Returns the id of the last row whose embedding was written, or 0.
+    """
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        create_embedding_checkpoint_table(cur)
+        cur.execute(f"SELECT last_row_id FROM {EMBEDDING_CHECKPOINT_TABLE} WHERE table_name = %s;", (table_name,))
+        row = cur.fetchone()
+        conn.commit()
+    return row[0] if row else 0
+
+
+def save_embedding_checkpoint(table_name: str, last_row_id: int):
+    """
+    Records that embeddings are written for every row up to last_row_id.
+    """
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {EMBEDDING_CHECKPOINT_TABLE} (table_name, last_row_id, updated_at)
+            VALUES (%s, %s, now())
+            ON CONFLICT (table_name) DO UPDATE SET last_row_id = EXCLUDED.last_row_id, updated_at = now();
+        """, (table_name, last_row_id))
+        conn.commit()
+
+
+def clear_embedding_checkpoint(table_name: str):
+    """
+    Removes a table's embedding checkpoint once all of its rows are embedded,
+    or when the table is dropped or created, since its row ids restart then.
+    """
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        create_embedding_checkpoint_table(cur)
+        cur.execute(f"DELETE FROM {EMBEDDING_CHECKPOINT_TABLE} WHERE table_name = %s;", (table_name,))
+        conn.commit()
 
 
 def format_row_as_text(columns: list[str], row: tuple) -> str:
@@ -118,67 +264,12 @@ def create_langchain_docs_from_rows(table_name: str, rows: list[tuple], columns:
     return docs
 
 
-def get_all_columns_and_types(table_name):
-    """
-    Fetches all columns and their data types from a table.
-    """
-    filtered_columns = []
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
-
-    try:
-        # Get all columns and their data types
-        cur.execute(f"""
-            SELECT column_name, data_type
-            FROM information_schema.columns
-            WHERE table_name = %s;
-        """, (table_name,))
-        all_columns = cur.fetchall()
-        filtered_columns = [(col, dtype) for col, dtype in all_columns]
-
-    except Exception as e:
-        print(f"Error fetching columns from {table_name}: {str(e)}")
-        conn.rollback()
-
-    cur.close()
-    conn.close()
-
-    return filtered_columns
-
-
-def get_primary_key(table_name: str) -> str:
-    """
-    Fetches the primary key column from a table.
-    """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
-
-    try:
-        # Get primary key column(s)
-                # Get primary key column(s)
-        cur.execute(f"""
-            SELECT a.attname
-            FROM   pg_index i
-            JOIN   pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-            WHERE  i.indrelid = '{table_name}'::regclass AND i.indisprimary;
-        """)
-        primary_keys = {row[0] for row in cur.fetchall()}
-
-    except Exception as e:
-        print(f"Error fetching primary key from {table_name}: {str(e)}")
-        conn.rollback()
-
-    cur.close()
-    conn.close()
-
-    return primary_keys
-
-
 def convert_postgres_to_react(columns_and_types):
     postgres_to_react_map = {
         "text": "string",
         "boolean": "boolean",
         "integer": "number",
+        "bigint": "number",
         "double precision": "number",
         "timestamp": "string",
         "float": "number",
@@ -0,0 +1,99 @@
+"""
+In-process LRU/TTL cache of run_query retrieval results.
+
+Entries are keyed by table name, normalized SQL text and the table's data version.
+The version is bumped when the table is re-ingested or deleted, and every version is bumped
+when a manipulation query commits, since generated SQL can write any table.
+A result computed before a write is never served after it.
+"""
+import re
+import time
+import threading
+from itertools import count
+from utilities.store_registry import StoreRegistry
+from config import postgres_var
+
+query_results = StoreRegistry("query results", max_entries=postgres_var.query_cache_max_entries)
+query_cache_stats = {"hits": 0, "misses": 0, "expired": 0, "uncached": 0}
+query_cache_lock = threading.Lock()
+
+# Versions come from one counter, so a dropped and re-created table never reuses one
+version_counter = count(1)
+table_data_versions = {}
+
+# Single-quoted literals, including '' escapes, are kept verbatim
+SQL_LITERAL_PATTERN = re.compile(r"('(?:[^']|'')*')")
+
+
+def normalize_sql(query: str) -> str:
+    """Collapses whitespace outside string literals and drops trailing semicolons"""
+    parts = SQL_LITERAL_PATTERN.split(query.strip().rstrip(";").strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def get_table_data_version(table_name: str) -> int:
+    with query_cache_lock:
+        return table_data_versions.get(table_name, 0)
+
+
+def bump_table_data_version(table_name: str):
+    """Marks every cached result of a table stale; called after its data changes"""
+    with query_cache_lock:
+        table_data_versions[table_name] = next(version_counter)
+    query_results.invalidate_where(lambda key: key[0] == table_name)
+
+
+def clear_query_cache():
+    """Drops every cached result, e.g. after a manipulation query that may touch any table"""
+    with query_cache_lock:
+        for table_name in table_data_versions:
+            table_data_versions[table_name] = next(version_counter)
+    query_results.clear()
+
+
+def query_cache_key(table_name: str, query: str) -> tuple:
+    """Key of a query against the table's current data version; take it before running the query"""
+    return (table_name, normalize_sql(query), get_table_data_version(table_name))
+
+
+def count_lookup(outcome: str):
+    with query_cache_lock:
+        query_cache_stats[outcome] += 1
+
+
+def get_cached_query_result(key: tuple) -> list[dict]:
+    """Returns a copy of a fresh cached result, None on a miss"""
+    if postgres_var.query_cache_ttl_seconds <= 0:
+        return None
+    entry = query_results.get(key)
+    if entry is None:
+        count_lookup("misses")
+        return None
+    if time.monotonic() - entry["at"] > postgres_var.query_cache_ttl_seconds:
+        query_results.invalidate(key)
+        count_lookup("expired")
+        return None
+    count_lookup("hits")
+    return [dict(row) for row in entry["rows"]]
+
+
+def store_query_result(key: tuple, rows: list[dict]):
+    """Caches a result unless caching is off or it exceeds QUERY_CACHE_MAX_ROWS"""
+    if postgres_var.query_cache_ttl_seconds <= 0:
+        return
+    if len(rows) > postgres_var.query_cache_max_rows or key[2] != get_table_data_version(key[0]):
+        count_lookup("uncached")
+        return
+    query_results.put(key, {"rows": [dict(row) for row in rows], "at": time.monotonic()})
+
+
+def get_query_cache_stats() -> dict:
+    """Returns hit/miss counters, the hit rate and the number of cached results"""
+    with query_cache_lock:
+        stats = dict(query_cache_stats)
+    lookups = stats["hits"] + stats["misses"] + stats["expired"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    registry_stats = query_results.get_stats()
+    stats["entries"] = registry_stats["entries"]
+    stats["evicted"] = registry_stats["evicted"]
+    return stats
@@ -0,0 +1,96 @@
+"""
+In-process catalog of table schemas: columns and types in table order, the primary key
+and the React column types of the table view.
+
+Request handlers and agents read it instead of querying information_schema and pg_index
+on every page request and chat turn. Ingest fills a table's entry, deleting a table or
+running a DDL-style manipulation query invalidates it.
+"""
+import re
+from utilities.store_registry import StoreRegistry
+from db.tabular.postgres_utilities import convert_postgres_to_react
+from config import postgres_var
+
+# table name -> {"columns", "primary_keys", "react_types"}
+table_schemas = StoreRegistry("table schemas", max_entries=1024)
+
+# Statements that can change a table's columns, keys or existence
+DDL_PATTERN = re.compile(r"\b(ALTER|CREATE|DROP|RENAME|TRUNCATE)\b", re.IGNORECASE)
+
+table_schema_query = """
+    SELECT c.column_name,
+           c.data_type,
+           EXISTS (
+               SELECT 1
+               FROM   pg_index i
+               JOIN   pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+               WHERE  i.indrelid = to_regclass(%s) AND i.indisprimary AND a.attname = c.column_name
+           ) AS is_primary
+    FROM information_schema.columns c
+    WHERE c.table_name = %s AND c.table_schema = current_schema()
+    ORDER BY c.ordinal_position;
+"""
+
+
+def build_table_schema(rows: list[tuple]) -> dict:
+    """Builds a catalog entry from the rows of table_schema_query, None if the table does not exist"""
+    if not rows:
+        return None
+    columns = [(column_name, data_type) for column_name, data_type, _ in rows]
+    primary_keys = {column_name for column_name, _, is_primary in rows if is_primary}
+    return {
+        "columns": columns,
+        "primary_keys": primary_keys,
+        "react_types": convert_postgres_to_react([column for column in columns if column[0] not in primary_keys]),
+    }
+
+
+def fetch_table_schema(table_name: str) -> dict:
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(table_schema_query, (table_name, table_name))
+        return build_table_schema(cur.fetchall())
+
+
+def get_table_schema(table_name: str) -> dict:
+    """
+    Returns the cached schema of a table, None if it does not exist.
+    Missing tables are not cached, so a table created later is found.
+    """
+    schema = table_schemas.get(table_name)
+    if schema is None:
+        schema = fetch_table_schema(table_name)
+        if schema is not None:
+            table_schemas.put(table_name, schema)
+    return schema
+
+
+async def get_table_schema_async(table_name: str) -> dict:
+    """get_table_schema over the async pool"""
+    schema = table_schemas.get(table_name)
+    if schema is None:
+        async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+            await cur.execute(table_schema_query, (table_name, table_name))
+            schema = build_table_schema(await cur.fetchall())
+        if schema is not None:
+            table_schemas.put(table_name, schema)
+    return schema
+
+
+def refresh_table_schema(table_name: str) -> dict:
+    """Reloads a table's entry, e.g. after ingest created or widened its columns"""
+    table_schemas.invalidate(table_name)
+    return get_table_schema(table_name)
+
+
+def invalidate_table_schema(table_name: str):
+    table_schemas.invalidate(table_name)
+
+
+def invalidate_schemas_for_query(query: str):
+    """
+    Drops cached schemas a manipulation query may have changed.
+    DDL can name any table, so every entry is dropped; other writes leave the catalog alone.
+    """
+    if DDL_PATTERN.search(query):
+        table_schemas.clear()
+
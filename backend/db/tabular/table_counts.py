@@ -0,0 +1,49 @@
+"""
+Row counts for table browsing without a COUNT(*) scan on every page request.
+
+Counts are cached per table for TABLE_COUNT_CACHE_SECONDS. Tables the planner estimates
+above TABLE_EXACT_COUNT_THRESHOLD rows report that estimate instead of being counted,
+unless an exact count is requested. Ingest sets the count it loaded and writes invalidate it.
+"""
+import time
+from utilities.store_registry import StoreRegistry
+from config import postgres_var
+
+# table name -> {"count", "exact", "at"}
+table_row_counts = StoreRegistry("table row counts", max_entries=1024)
+
+
+def set_table_row_count(table_name: str, count: int, exact: bool = True):
+    table_row_counts.put(table_name, {"count": count, "exact": exact, "at": time.monotonic()})
+
+
+def invalidate_table_row_count(table_name: str):
+    table_row_counts.invalidate(table_name)
+
+
+def clear_table_row_counts():
+    """Drops every cached count, e.g. after a manipulation query that may touch any table"""
+    table_row_counts.clear()
+
+
+async def get_table_row_count(cur, table_name: str, exact: bool = False) -> tuple[int, bool]:
+    """
+    Returns (row count, whether it is exact) for a table, using an open async cursor.
+    """
+    cached = table_row_counts.get(table_name)
+    if cached is not None and time.monotonic() - cached["at"] < postgres_var.table_count_cache_seconds:
+        if cached["exact"] or not exact:
+            return cached["count"], cached["exact"]
+
+    if not exact:
+        # reltuples is -1 (or 0) until the table has been vacuumed or analyzed
+        await cur.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", (table_name,))
+        estimate = (await cur.fetchone())[0]
+        if estimate > postgres_var.table_exact_count_threshold:
+            set_table_row_count(table_name, estimate, exact=False)
+            return estimate, False
+
+    await cur.execute(f"SELECT COUNT(*) FROM {table_name}")
+    count = (await cur.fetchone())[0]
+    set_table_row_count(table_name, count)
+    return count, True
@@ -1,53 +1,103 @@
-from config import postgres_var
+from config import postgres_var, ingest_var
+from typing import Iterator
 from llm_core.langgraph.utilities.embedding_utils import get_embedder
-from db.tabular.postgres_utilities import fetch_all_rows_from_table, create_langchain_docs_from_rows, get_all_columns_and_types
+from llm_core.langgraph.utilities.embedding_pipeline import rebatch, write_embedding_batches
+from db.tabular.postgres_utilities import iter_rows_from_table, create_langchain_docs_from_rows, get_embedding_checkpoint, save_embedding_checkpoint, clear_embedding_checkpoint
+from db.tabular.vector_index import ROW_EMBEDDING_DIMENSIONS, collection_name_for, create_vector_index, search_vector_index, invalidate_collection_uuid
+from utilities.store_registry import StoreRegistry
 from langchain_core.documents import Document
 from langchain_postgres import PGVector
 
 
+row_vector_stores = StoreRegistry("row vector stores")
 
-def create_embeddings_of_table_rows(table_name: str, docs: list):
+
+def get_row_vector_store(table_name: str) -> PGVector:
+    """
+    Returns the shared PGVector store of a table's row collection.
+    PGVector sets up the extension, tables and collection when built, so it is built once per table.
+    """
+    return row_vector_stores.get_or_create(table_name, lambda: PGVector(
+        embeddings=get_embedder(ROW_EMBEDDING_DIMENSIONS),
+        collection_name=collection_name_for(table_name),
+        connection=postgres_var.get_db_url(),
+    ))
+
+
+def invalidate_table_stores(table_name: str):
+    """
+    Drops the cached vector store and collection id of a deleted table.
+    """
+    row_vector_stores.invalidate(table_name)
+    invalidate_collection_uuid(collection_name_for(table_name))
+
+
+def create_embeddings_of_table_rows(table_name: str) -> dict:
     """
     Creates embeddings of the rows in the table. To be used for similarity search of table rows.
+    Rows are streamed in batches of EMBEDDING_BATCH_SIZE and written concurrently with
+    retries and rate-limit backoff. Progress is checkpointed, so a failed run resumes
+    after the last fully written row when it is repeated.
+    The collection's ANN index is built once every row is written.
+    Returns throughput metrics.
     """
+    collection_name = collection_name_for(table_name)
+    id_str = str(table_name) + "_id"
+
     try:
-        collection_name = table_name + "_collection"
-        vector_store = PGVector(
-            embeddings=get_embedder(512),
-            collection_name=collection_name,
-            connection=postgres_var.get_db_url(),
+        vector_store = get_row_vector_store(table_name)
+
+        after_id = get_embedding_checkpoint(table_name)
+        if after_id:
+            print(f"Resuming embeddings for table {table_name} after row {after_id}")
+
+        doc_batches = rebatch(get_docs_from_rows(table_name, after_id=after_id), ingest_var.embedding_batch_size)
+        stats = write_embedding_batches(
+            doc_batches,
+            write_batch=lambda docs: vector_store.add_documents(docs, ids=[doc.metadata[id_str] for doc in docs]),
+            text_of=lambda doc: doc.page_content,
+            on_checkpoint=lambda doc: save_embedding_checkpoint(table_name, row_id_from_doc(doc, id_str)),
+            label=f"Embeddings for {table_name}",
         )
-        id_str = str(table_name) + "_id"
-        vector_store.add_documents(docs, ids=[doc.metadata[id_str] for doc in docs])
+        clear_embedding_checkpoint(table_name)
+        try:
+            # Built concurrently so inserts into other collections are not blocked
+            stats["vector_index"] = create_vector_index(collection_name, concurrently=True)
+        except Exception as e:
+            # Searches still work without the index, just as a full scan
+            print(f"Error building vector index for table {table_name}: {str(e)}")
+        return stats
     except Exception as e:
         print(f"Error creating embeddings for table {table_name}: {str(e)}")
+        raise
 
 
-def retrieve_table_embeddings(table_name: str, query: str, k: int) -> list[tuple[str, float]]:
+def row_id_from_doc(doc: Document, id_str: str) -> int:
+    """
+    Returns the table row id a row Document was created from.
+    """
+    return int(doc.metadata[id_str].rsplit("_", 1)[1])
+
+
+def retrieve_table_embeddings(table_name: str, query: str, k: int) -> list[tuple[Document, float]]:
     """
     Retrieves embeddings of table rows that are similar to the query.
-    Returns a list of (row_id, similarity_score) tuples.
+    Searches the collection's ANN index (see db.tabular.vector_index).
+    Returns a list of (Document, distance) tuples.
     """
     try:
-        collection_name = table_name + "_collection"
-        vector_store = PGVector(
-            embeddings=get_embedder(512),
-            collection_name=collection_name,
-            connection=postgres_var.get_db_url(),
-        )
-        return vector_store.similarity_search_with_score(query, k=k)
+        embedding = get_embedder(ROW_EMBEDDING_DIMENSIONS).embed_query(query)
+        return search_vector_index(collection_name_for(table_name), embedding, k)
     except Exception as e:
         print(f"Error retrieving embeddings for table {table_name}: {str(e)}")
         return []
 
 
-def get_docs_from_rows(table_name: str) -> list[Document]:
+def get_docs_from_rows(table_name: str, fetch_size: int = None, after_id: int = 0) -> Iterator[list[Document]]:
     """
-    Fetches all rows from a table and converts them into Langchain Documents.
-    Returns a list of Documents.
+    Streams the rows of a table through a server-side cursor and converts them into Langchain Documents.
+    Yields one list of Documents per batch of fetch_size rows, starting after row after_id.
     """
-    rows = fetch_all_rows_from_table(table_name)
-    columns_types = get_all_columns_and_types(table_name)
-    columns = [col[0] for col in columns_types]
-    return create_langchain_docs_from_rows(table_name, rows, columns)
-
+    fetch_size = fetch_size or ingest_var.row_fetch_size
+    for columns, rows in iter_rows_from_table(table_name, fetch_size, after_id):
+        yield create_langchain_docs_from_rows(table_name, rows, columns)
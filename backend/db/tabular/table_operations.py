@@ -1,78 +1,138 @@
+import asyncio
+import json
+import base64
+import binascii
+import time
+from uuid import uuid4
+from typing import AsyncIterator
 from config import postgres_var
 from fastapi import HTTPException
-import psycopg2
-from db.tabular.postgres_utilities import convert_postgres_to_react, get_all_columns_and_types
+import psycopg
+from db.tabular.schema_catalog import get_table_schema_async, invalidate_table_schema, invalidate_schemas_for_query
+from db.tabular.query_cache import (query_cache_key, get_cached_query_result, store_query_result,
+                                    bump_table_data_version, clear_query_cache)
+from db.tabular.vector_index import drop_vector_index, collection_name_for
+from db.tabular.postgres_utilities import clear_embedding_checkpoint
+from db.tabular.table_counts import get_table_row_count, invalidate_table_row_count, clear_table_row_counts
+from db.tabular.file_registry import list_registered_files, unregister_file
 from utilities.os_re_tools import split_words_by_commas_and_spaces
 
-def run_query(table_name: str, query: str, role: str, query_type: str)-> list[str]:
+async def run_query(table_name: str, query: str, role: str, query_type: str)-> list[str]:
     """
     Runs a query on a table and returns the results as a list of strings.
+    Retrieval results are served from the query result cache while the table's data is unchanged.
     """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(f"SELECT to_regclass('{table_name}')")
-    table_exists = cur.fetchone()[0]
-    if not table_exists:
+    if await get_table_schema_async(table_name) is None:
         raise HTTPException(status_code=404, detail=f"Table {table_name} not found.")
-    
-    filtered_llm_query_result = []
-    
-    if query_type == "retrieval":
-        cur.execute(f"SELECT column_name FROM information_schema.columns WHERE table_name = '{table_name}';")
-        
-        cur.execute(query)
-        columns = cur.description
-        values = cur.fetchall()
 
-        llm_query_result = [dict(zip([col[0] for col in columns if col], row)) for row in values]
+    if query_type == "retrieval":
+        cache_key = query_cache_key(table_name, query)
+        cached_result = get_cached_query_result(cache_key)
+        if cached_result is not None:
+            return cached_result
 
-        for row in llm_query_result:
-            filtered_llm_query_result.append(row)
-             
-    if query_type == "manipulation":
-        cur.execute(query)
-        conn.commit()
+    async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+        filtered_llm_query_result = []
+        
+        if query_type == "retrieval":
+            await cur.execute(query)
+            columns = cur.description
+            values = await cur.fetchall()
+
+            llm_query_result = [dict(zip([col[0] for col in columns if col], row)) for row in values]
+
+            for row in llm_query_result:
+                filtered_llm_query_result.append(row)
+            store_query_result(cache_key, filtered_llm_query_result)
+                 
+        if query_type == "manipulation":
+            await cur.execute(query)
+            await conn.commit()
+            invalidate_schemas_for_query(query)
+            # Generated SQL can write any table, not only table_name
+            clear_table_row_counts()
+            clear_query_cache()
 
     return filtered_llm_query_result
 
 
 
-def levenshtein_dist(table_name: str, words: str):
+async def stream_query(table_name: str, query: str, max_rows: int = None) -> AsyncIterator[str]:
+    """
+    Runs a retrieval query through a server-side cursor and returns an async iterator of
+    NDJSON lines: one JSON object per row, then a final {"stats": ...} line with the row count,
+    whether SQL_STREAM_MAX_ROWS (or a lower max_rows) truncated the result, and timings.
+    Only SQL_STREAM_FETCH_SIZE rows are held in memory at a time. The query runs read-only.
+    """
+    if await get_table_schema_async(table_name) is None:
+        raise HTTPException(status_code=404, detail=f"Table {table_name} not found.")
+    max_rows = min(max_rows, postgres_var.sql_stream_max_rows) if max_rows else postgres_var.sql_stream_max_rows
+    fetch_size = postgres_var.sql_stream_fetch_size
+
+    async def generate():
+        stats = {"rows": 0, "truncated": False, "first_row_ms": None, "elapsed_ms": None}
+        start = time.monotonic()
+        try:
+            async with postgres_var.async_connection() as conn:
+                await conn.execute("SET TRANSACTION READ ONLY")
+                async with conn.cursor(name=f"sql_stream_{uuid4().hex}") as cur:
+                    await cur.execute(query)
+                    columns = None
+                    while stats["rows"] < max_rows:
+                        rows = await cur.fetchmany(min(fetch_size, max_rows - stats["rows"]))
+                        if not rows:
+                            break
+                        if columns is None:
+                            columns = [col[0] for col in cur.description]
+                            stats["first_row_ms"] = round((time.monotonic() - start) * 1000, 2)
+                        stats["rows"] += len(rows)
+                        yield "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+                    if stats["rows"] >= max_rows:
+                        stats["truncated"] = bool(await cur.fetchmany(1))
+        except psycopg.Error as e:
+            print(f"Error streaming query on {table_name}: {str(e)}")
+            stats["error"] = str(e)
+        stats["elapsed_ms"] = round((time.monotonic() - start) * 1000, 2)
+        yield json.dumps({"stats": stats}) + "\n"
+
+    return generate()
+
+
+async def levenshtein_dist(table_name: str, words: str):
     """ Counts how many single-character edits (insertion, deletion, substitution) it takes to transform one string into another.
         It has no understanding of meaning, context, or semantics — it’s purely syntactic."""
 
     try:
-        connection = postgres_var.get_db_connection()
-        cur = connection.cursor()
-    
         words_list = split_words_by_commas_and_spaces(words)
     
-        columns_and_types = get_all_columns_and_types(table_name)
-    
         results = []
         non_text_columns = []
 
-        for word in words_list:
-            query_parts = []
-    
-            for column_name, type in columns_and_types:
-                if type == "text":
-                    non_text_columns.append(column_name)
-                query_parts.append(f"""
-                    SELECT '{column_name}' AS column_name,
-                           {column_name}::text AS column_value,
-                           levenshtein({column_name}::text, %s) AS lev_distance
-                    FROM {table_name}
-                """)
-    
-            # Combine all column queries with UNION ALL
-            final_query = " UNION ALL ".join(query_parts) + " ORDER BY lev_distance LIMIT 30;"
-    
-            cur.execute(final_query, (word,) * len(columns_and_types))
-            rows = cur.fetchall()
-            for row in rows:
-                results.append((word, *row))
+        schema = await get_table_schema_async(table_name)
+        columns_and_types = schema["columns"] if schema else []
+
+        async with postgres_var.async_connection() as connection, connection.cursor() as cur:
+
+            for word in words_list:
+                query_parts = []
+        
+                for column_name, type in columns_and_types:
+                    if type == "text":
+                        non_text_columns.append(column_name)
+                    query_parts.append(f"""
+                        SELECT '{column_name}' AS column_name,
+                               {column_name}::text AS column_value,
+                               levenshtein({column_name}::text, %s) AS lev_distance
+                        FROM {table_name}
+                    """)
+        
+                # Combine all column queries with UNION ALL
+                final_query = " UNION ALL ".join(query_parts) + " ORDER BY lev_distance LIMIT 30;"
+        
+                await cur.execute(final_query, (word,) * len(columns_and_types))
+                rows = await cur.fetchall()
+                for row in rows:
+                    results.append((word, *row))
         
         
         # remove text types
@@ -94,74 +154,90 @@ def levenshtein_dist(table_name: str, words: str):
     
         sorted_results = [result[1:] for result in sorted_results]
 
-        cur.close()
-        connection.close()
-
         return sorted_results
 
-    except psycopg2.DatabaseError as e:
+    except psycopg.DatabaseError as e:
         print(f"Error: {str(e)}")
         return []
     
 
-def get_table_data(table_name: str, page: int, page_size: int):
+def encode_page_cursor(direction: str, key) -> str:
+    """Returns an opaque cursor for the rows after or before a primary key value"""
+    return base64.urlsafe_b64encode(json.dumps({direction: key}).encode("utf-8")).decode("ascii")
+
+
+def decode_page_cursor(cursor: str) -> tuple[str, object]:
+    """Returns (direction, key) of a cursor made by encode_page_cursor"""
+    try:
+        (direction, key), = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))).items()
+    except (ValueError, TypeError, AttributeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid page cursor.")
+    if direction not in ("after", "before"):
+        raise HTTPException(status_code=400, detail="Invalid page cursor.")
+    return direction, key
+
+
+async def get_table_data(table_name: str, page: int, page_size: int, cursor: str = None, exact_count: bool = False):
     """
     Fetches data from a table and returns it as a list of dictionaries.
-    """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
 
-    # Check if table exists
-    cur.execute(f"SELECT to_regclass(%s)", (table_name,))
-    table_exists = cur.fetchone()[0]
-    if not table_exists:
+    Rows are ordered by the primary key. With a single-column primary key (the id SERIAL
+    of ingested tables) the response carries next/prev cursors; passing one back seeks
+    past that key instead of skipping OFFSET rows, so deep pages cost the same as the first.
+    total_rows is cached, and for large tables is the planner's estimate (total_rows_exact
+    is False) unless exact_count is set.
+    """
+    schema = await get_table_schema_async(table_name)
+    if schema is None:
         raise HTTPException(status_code=404, detail=f"Table {table_name} not found.")
-
-    # Get primary key column
-    cur.execute(f"""
-        SELECT a.attname
-        FROM   pg_index i
-        JOIN   pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-        WHERE  i.indrelid = %s::regclass AND i.indisprimary;
-    """, (table_name,))
-    primary_keys = {row[0] for row in cur.fetchall()}
-
-    # Get all column names and primary key
-    cur.execute(f"""
-        SELECT column_name
-        FROM information_schema.columns
-        WHERE table_name = %s;
-    """, (table_name,))
-    all_columns = [row[0] for row in cur.fetchall()]
-    selected_columns = [col for col in all_columns if col not in primary_keys]
-
-    # Get column names and types for header (excluding embedding and primary key)
-    cur.execute(f"""
-        SELECT column_name, data_type
-        FROM information_schema.columns
-        WHERE table_name = %s;
-    """, (table_name,))
-    all_column_types = cur.fetchall()
-    filtered_column_types = [(col, dtype) for col, dtype in all_column_types if col not in primary_keys]
-    columns_and_types = convert_postgres_to_react(filtered_column_types)
-
-    # Total rows
-    cur.execute(f"SELECT COUNT(*) FROM {table_name}")
-    total_rows = cur.fetchone()[0]
-    offset = (page - 1) * page_size
-
-    # Fetch paginated rows (exclude primary key & embedding)
-    column_list = ", ".join(selected_columns) + ", ctid"
-    cur.execute(f"""
-        SELECT {column_list}
-        FROM {table_name}
-        LIMIT %s OFFSET %s
-    """, (page_size, offset))
-    rows = cur.fetchall()
-    columns = [desc[0] for desc in cur.description]
-
-    cur.close()
-    conn.close()
+    primary_keys = schema["primary_keys"]
+    selected_columns = [col for col, _ in schema["columns"] if col not in primary_keys]
+    columns_and_types = schema["react_types"]
+
+    async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+        total_rows, total_rows_exact = await get_table_row_count(cur, table_name, exact_count)
+        offset = (page - 1) * page_size
+
+        # Fetch paginated rows (exclude primary key & embedding)
+        column_list = ", ".join(selected_columns) + ", ctid"
+        if len(primary_keys) != 1:
+            await cur.execute(f"""
+                SELECT {column_list}
+                FROM {table_name}
+                LIMIT %s OFFSET %s
+            """, (page_size, offset))
+            rows = await cur.fetchall()
+            columns = [desc[0] for desc in cur.description]
+            next_cursor = prev_cursor = None
+        else:
+            # The key is selected last to build the cursors, one extra row tells if another page follows
+            key = next(iter(primary_keys))
+            direction, cursor_key = decode_page_cursor(cursor) if cursor else (None, None)
+            if direction == "after":
+                seek, params = f"WHERE {key} > %s ORDER BY {key}", (cursor_key, page_size + 1)
+            elif direction == "before":
+                seek, params = f"WHERE {key} < %s ORDER BY {key} DESC", (cursor_key, page_size + 1)
+            else:
+                seek, params = f"ORDER BY {key} OFFSET {int(offset)}", (page_size + 1,)
+            await cur.execute(f"""
+                SELECT {column_list}, {key}
+                FROM {table_name}
+                {seek}
+                LIMIT %s
+            """, params)
+            rows = await cur.fetchall()
+            columns = [desc[0] for desc in cur.description][:-1]
+
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            if direction == "before":
+                rows.reverse()
+                has_next, has_prev = True, has_more
+            else:
+                has_next, has_prev = has_more, direction == "after" or offset > 0
+            next_cursor = encode_page_cursor("after", rows[-1][-1]) if rows and has_next else None
+            prev_cursor = encode_page_cursor("before", rows[0][-1]) if rows and has_prev else None
+            rows = [row[:-1] for row in rows]
 
     # Build the table object
     table_data = {
@@ -170,49 +246,58 @@ def get_table_data(table_name: str, page: int, page_size: int):
         "page": page,
         "page_size": page_size,
         "total_rows": total_rows,
-        "total_pages": (total_rows + page_size - 1) // page_size
+        "total_rows_exact": total_rows_exact,
+        "total_pages": (total_rows + page_size - 1) // page_size,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
     }
 
     return table_data
 
 
-def delete_table(table_name: str):
+async def delete_table(table_name: str):
     """
-    Deletes a table from the database.
+    Deletes a table from the database, then clears its cached counts and schema,
+    its embedding checkpoint, its file registry entry and its vector index.
+    The cleanup is best effort: a failed step is logged and the delete still succeeds.
     Does not delete embeddings from vector store
     """
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
+    async with postgres_var.async_connection() as conn, conn.cursor() as cur:
+        try:
+            await cur.execute(f"DROP TABLE IF EXISTS {table_name}")
+            await conn.commit()
+        except Exception as e:
+            print(f"Unexpected error: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to delete table")
+
+    invalidate_table_row_count(table_name)
+    invalidate_table_schema(table_name)
+    bump_table_data_version(table_name)
+
     try:
-        cur.execute(f"DROP TABLE IF EXISTS {table_name}")
-        conn.commit()
+        await asyncio.to_thread(clear_embedding_checkpoint, table_name)
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to delete table")
-    cur.close()
-    conn.close()
+        print(f"Error clearing embedding checkpoint for table {table_name}: {str(e)}")
+    try:
+        await unregister_file(table_name)
+    except Exception as e:
+        print(f"Error removing table {table_name} from the file registry: {str(e)}")
+    try:
+        await asyncio.to_thread(drop_vector_index, collection_name_for(table_name))
+    except Exception as e:
+        print(f"Error dropping vector index for table {table_name}: {str(e)}")
 
     return {"message": f"Table {table_name} deleted successfully."}
     
 
-def get_table_names_from_db():
-    conn = postgres_var.get_db_connection()
-    cur = conn.cursor()
+async def get_table_names_from_db():
+    """
+    Returns the names of the ingested CSV tables from the file registry.
+    """
     try:
-        cur.execute("""
-            SELECT c.relname AS table_name
-            FROM pg_class c
-            JOIN pg_description d ON c.oid = d.objoid
-            WHERE c.relkind = 'r'  -- 'r' stands for ordinary table
-            AND c.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = 'public')
-            AND d.description = 'source_type: csv';
-        """)
-        files = [row[0] for row in cur.fetchall()]
+        files = await list_registered_files("csv")
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
-    cur.close()
-    conn.close()
-
-    return files
\ No newline at end of file
+    return [file["name"] for file in files]
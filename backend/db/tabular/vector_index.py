@@ -0,0 +1,228 @@
+"""
+Approximate nearest neighbour indexes for the PGVector row collections.
+
+Every table's row embeddings share langchain's embedding table, so each collection
+gets its own partial index over (embedding::vector(dims)) restricted to its
+collection_id. Searches use the same expression and predicate, so the planner
+picks the collection's index instead of scanning every stored embedding.
+
+Rebuild indexes from the backend directory:
+    python -m db.tabular.vector_index <table_name> [<table_name> ...] [--type hnsw|ivfflat]
+    python -m db.tabular.vector_index --all
+"""
+import time
+import argparse
+from typing import Optional
+from rich import print as rprint
+from langchain_core.documents import Document
+from config import postgres_var, ingest_var
+from utilities.store_registry import StoreRegistry
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+ROW_EMBEDDING_DIMENSIONS = 512
+VECTOR_INDEX_TYPES = ("hnsw", "ivfflat")
+
+collection_uuids = StoreRegistry("collection uuids", max_entries=4096)
+
+
+def collection_name_for(table_name: str) -> str:
+    """Returns the PGVector collection holding a table's row embeddings"""
+    return table_name + "_collection"
+
+
+def vector_index_name(collection_uuid: str) -> str:
+    """Returns the name of a collection's ANN index (fits the 63 character identifier limit)"""
+    return f"{EMBEDDING_TABLE}_ann_{collection_uuid.replace('-', '')}"
+
+
+def embedding_expression(dimensions: int) -> str:
+    """Returns the indexed expression; the shared embedding column has no fixed dimension"""
+    return f"(embedding::vector({dimensions}))"
+
+
+def to_vector_literal(embedding: list[float]) -> str:
+    return "[" + ",".join(str(float(value)) for value in embedding) + "]"
+
+
+def get_collection_uuid(collection_name: str) -> Optional[str]:
+    """
+    Returns the uuid of a PGVector collection, or None if it does not exist.
+    Found uuids are cached until invalidate_collection_uuid.
+    """
+    collection_uuid = collection_uuids.get_or_create(collection_name, lambda: lookup_collection_uuid(collection_name))
+    if collection_uuid is None:
+        collection_uuids.invalidate(collection_name)
+    return collection_uuid
+
+
+def invalidate_collection_uuid(collection_name: str):
+    collection_uuids.invalidate(collection_name)
+
+
+def lookup_collection_uuid(collection_name: str) -> Optional[str]:
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s);", (COLLECTION_TABLE,))
+        if cur.fetchone()[0] is None:
+            return None
+        cur.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s;", (collection_name,))
+        row = cur.fetchone()
+    return str(row[0]) if row else None
+
+
+def ivfflat_lists_for(rows: int) -> int:
+    """Returns the number of IVFFlat lists for a collection size (pgvector's recommendation)"""
+    if ingest_var.ivfflat_lists:
+        return ingest_var.ivfflat_lists
+    return max(1, int(rows ** 0.5) if rows > 1000000 else rows // 1000)
+
+
+def create_vector_index(collection_name: str,
+                        dimensions: int = ROW_EMBEDDING_DIMENSIONS,
+                        index_type: Optional[str] = None,
+                        concurrently: bool = False) -> Optional[dict]:
+    """
+    Creates the ANN index of a collection if it does not exist yet.
+    Building after the bulk load is much cheaper than maintaining the index during inserts.
+    concurrently builds without blocking writes to the other collections.
+    Returns build details, or None when indexing is disabled or the collection is missing.
+    """
+    index_type = index_type or ingest_var.vector_index_type
+    if index_type not in VECTOR_INDEX_TYPES:
+        return None
+    collection_uuid = get_collection_uuid(collection_name)
+    if collection_uuid is None:
+        return None
+
+    index_name = vector_index_name(collection_uuid)
+    expression = embedding_expression(dimensions)
+    start = time.monotonic()
+
+    with postgres_var.connection() as conn:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block,
+        # so end any transaction the checked-out connection still has open
+        conn.rollback()
+        conn.autocommit = concurrently
+        try:
+            with conn.cursor() as cur:
+                if index_type == "hnsw":
+                    options = f"m = {ingest_var.hnsw_m}, ef_construction = {ingest_var.hnsw_ef_construction}"
+                else:
+                    cur.execute(f"SELECT COUNT(*) FROM {EMBEDDING_TABLE} WHERE collection_id = %s::uuid;", (collection_uuid,))
+                    options = f"lists = {ivfflat_lists_for(cur.fetchone()[0])}"
+
+                cur.execute(f"""
+                    CREATE INDEX {'CONCURRENTLY' if concurrently else ''} IF NOT EXISTS {index_name}
+                    ON {EMBEDDING_TABLE} USING {index_type} ({expression} vector_cosine_ops)
+                    WITH ({options})
+                    WHERE collection_id = %s::uuid;
+                """, (collection_uuid,))
+            if not concurrently:
+                conn.commit()
+        finally:
+            conn.autocommit = False
+
+    elapsed = time.monotonic() - start
+    rprint(f"Built {index_type} index {index_name} for {collection_name} ({options}) in {elapsed:.1f}s")
+    return {"index": index_name, "type": index_type, "options": options, "seconds": elapsed}
+
+
+def drop_vector_index(collection_name: str, concurrently: bool = False):
+    """
+    Drops the ANN index of a collection, if any.
+    """
+    collection_uuid = get_collection_uuid(collection_name)
+    if collection_uuid is None:
+        return
+
+    with postgres_var.connection() as conn:
+        conn.rollback()
+        conn.autocommit = concurrently
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP INDEX {'CONCURRENTLY' if concurrently else ''} IF EXISTS {vector_index_name(collection_uuid)};")
+            if not concurrently:
+                conn.commit()
+        finally:
+            conn.autocommit = False
+
+
+def reindex_vector_index(collection_name: str, index_type: Optional[str] = None) -> Optional[dict]:
+    """
+    Rebuilds the ANN index of a collection with the current build parameters,
+    e.g. after the collection grew enough to need more IVFFlat lists.
+    """
+    drop_vector_index(collection_name, concurrently=True)
+    return create_vector_index(collection_name, index_type=index_type, concurrently=True)
+
+
+def search_vector_index(collection_name: str,
+                        embedding: list[float],
+                        k: int,
+                        dimensions: int = ROW_EMBEDDING_DIMENSIONS,
+                        ef_search: Optional[int] = None,
+                        probes: Optional[int] = None,
+                        exact: bool = False) -> list[tuple[Document, float]]:
+    """
+    Returns the k nearest rows of a collection as (Document, cosine distance) tuples,
+    the same shape as PGVector.similarity_search_with_score.
+    ef_search / probes override the configured search parameters; exact forces a full scan.
+    """
+    collection_uuid = get_collection_uuid(collection_name)
+    if collection_uuid is None:
+        return []
+
+    expression = embedding_expression(dimensions)
+    vector = to_vector_literal(embedding)
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        if exact:
+            cur.execute("SET LOCAL enable_indexscan = off;")
+        else:
+            cur.execute("SET LOCAL hnsw.ef_search = %s;", (ef_search or ingest_var.hnsw_ef_search,))
+            cur.execute("SET LOCAL ivfflat.probes = %s;", (probes or ingest_var.ivfflat_probes,))
+
+        cur.execute(f"""
+            SELECT id, document, cmetadata, {expression} <=> %s::vector({dimensions}) AS distance
+            FROM {EMBEDDING_TABLE}
+            WHERE collection_id = %s::uuid
+            ORDER BY {expression} <=> %s::vector({dimensions})
+            LIMIT %s;
+        """, (vector, collection_uuid, vector, k))
+        rows = cur.fetchall()
+        conn.rollback()
+
+    return [(Document(id=row_id, page_content=document, metadata=metadata or {}), distance)
+            for row_id, document, metadata, distance in rows]
+
+
+def get_indexed_collections() -> list[str]:
+    """
+    Returns the names of every PGVector collection.
+    """
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s);", (COLLECTION_TABLE,))
+        if cur.fetchone()[0] is None:
+            return []
+        cur.execute(f"SELECT name FROM {COLLECTION_TABLE} ORDER BY name;")
+        return [row[0] for row in cur.fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the ANN indexes of table row collections")
+    parser.add_argument("tables", nargs="*", help="Tables whose row collection is reindexed")
+    parser.add_argument("--all", action="store_true", help="Reindex every collection")
+    parser.add_argument("--type", choices=VECTOR_INDEX_TYPES, default=None, help="Index type, defaults to VECTOR_INDEX_TYPE")
+    args = parser.parse_args()
+
+    collections = get_indexed_collections() if args.all else [collection_name_for(table) for table in args.tables]
+    if not collections:
+        parser.error("no tables given")
+    for collection_name in collections:
+        result = reindex_vector_index(collection_name, index_type=args.type)
+        if result is None:
+            rprint(f"Skipped {collection_name}: collection missing or VECTOR_INDEX_TYPE is none")
+    postgres_var.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,11 @@ from db.tabular.table_operations import run_query
 from rich import print as rprint
 
 
-def sql_agent_function(table_name: str, query: str, role: str, query_type: str):
+async def sql_agent_function(table_name: str, query: str, role: str, query_type: str):
     """"""
     message_str = ""
     try:
-        res = run_query(table_name, query, role, query_type)
+        res = await run_query(table_name, query, role, query_type)
         keys = list(res[0].keys())
         if len(keys) >= 1:
             for dict_res in res:
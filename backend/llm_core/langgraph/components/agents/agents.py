@@ -7,10 +7,11 @@ from rich import print as rprint
 from llm_core.langgraph.components.chains.chains import call_sql_agent, json_parser_prompt_augment_question
 from langgraph.types import interrupt, Command
 from llm_core.langgraph.utilities.utility_function import *
-from db.tabular.postgres_utilities import get_all_columns_and_types
+from db.tabular.schema_catalog import get_table_schema_async
 from db.tabular.table_operations import levenshtein_dist
 from db.tabular.table_embeddings import retrieve_table_embeddings
 import time
+import asyncio
 import logging
 
 # --- Provides response time tracking for each agent ---
@@ -45,10 +46,10 @@ async def sql_agent_node(state: MessageState) -> MessageState:
                 relevant_columns = state["table_relevant_data"]
 
                 # Get data from table by comparing pdf data points with levenshtein distance of values in table
-                ranked_results_via_ld = levenshtein_dist(state["table_name"], pdf_data_points)
+                ranked_results_via_ld = await levenshtein_dist(state["table_name"], pdf_data_points)
 
                 # Get data from table by comparing pdf data points with cosine similarity
-                ranked_results_via_similarity = retrieve_table_embeddings(state["table_name"], pdf_data_points, k=10)
+                ranked_results_via_similarity = await asyncio.to_thread(retrieve_table_embeddings, state["table_name"], pdf_data_points, k=10)
 
                 relevant_columns_from_pdf = [col.strip() for col in relevant_columns.split(",")]
 
@@ -121,7 +122,7 @@ async def sql_agent_node(state: MessageState) -> MessageState:
         if state["query_type"] == "retrieval":
             answer_retrieval_query = state["answer_retrieval_query"]
             # Test the query provided by the SQL Agent
-            test_query_result = sql_agent_function(table_name=state["table_name"], query=answer_retrieval_query, role=state["current_agent"], query_type="retrieval")
+            test_query_result = await sql_agent_function(table_name=state["table_name"], query=answer_retrieval_query, role=state["current_agent"], query_type="retrieval")
             if "Result" in test_query_result:
                 response["answer"] = "Query Successful when using query: " + answer_retrieval_query
                 response["query_failed"] = False
@@ -185,8 +186,8 @@ async def data_analyst_node(state: MessageState) -> MessageState:
         answer = pdf_retrieval_answer["response"]
         pdf_data_points = pdf_retrieval_answer["data_points"]
     else:
-        columns = get_all_columns_and_types(table_name)
-        col_str = ", ".join(item[0] for item in columns)
+        schema = await get_table_schema_async(table_name)
+        col_str = ", ".join(item[0] for item in schema["columns"]) if schema else ""
 
         # Get information from PDF KG
         input_variables={"question": question, "columns": col_str, "pdf_name": pdf_name}
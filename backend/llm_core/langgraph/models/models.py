@@ -27,6 +27,8 @@ class MessageInstance(BaseModel):
     visualizing_query: Optional[str] = None         # query thatn visualizes the answer
     viewing_query_label: Optional[str] = None       # label for the visualization
     query_type: Optional[str] = None                # query type (retrieval or manipulation)
+    job_id: Optional[str] = None                    # ingestion job id for upload progress events
+    job_status: Optional[str] = None                # ingestion job status (queued, running, completed, failed)
    
 
 class MessageState(TypedDict):
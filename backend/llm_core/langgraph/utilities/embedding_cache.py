@@ -0,0 +1,131 @@
+import hashlib
+import threading
+from typing import List
+from psycopg2.extras import execute_values
+from langchain_core.embeddings import Embeddings
+from config import postgres_var, ingest_var
+
+EMBEDDING_CACHE_TABLE = "embedding_cache"
+
+cache_stats = {"hits": 0, "misses": 0, "evicted": 0}
+cache_lock = threading.Lock()
+cache_state = {"table_ready": False, "inserts_since_eviction": 0}
+
+
+def hash_text(text: str) -> str:
+    """Returns the sha256 hex digest of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def ensure_embedding_cache_table():
+    """Creates the embedding cache table once per process"""
+    if cache_state["table_ready"]:
+        return
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {EMBEDDING_CACHE_TABLE} (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding REAL[] NOT NULL,
+                created_at TIMESTAMPTZ DEFAULT now(),
+                last_used_at TIMESTAMPTZ DEFAULT now(),
+                PRIMARY KEY (model, dimensions, text_hash)
+            );
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {EMBEDDING_CACHE_TABLE}_last_used_idx ON {EMBEDDING_CACHE_TABLE} (last_used_at);")
+        conn.commit()
+    cache_state["table_ready"] = True
+
+
+def get_embedding_cache_stats() -> dict:
+    """Returns cache hit/miss counters and the hit rate"""
+    with cache_lock:
+        stats = dict(cache_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def evict_embedding_cache(max_entries: int):
+    """Deletes the least recently used entries beyond max_entries"""
+    with postgres_var.connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            DELETE FROM {EMBEDDING_CACHE_TABLE}
+            WHERE ctid IN (
+                SELECT ctid FROM {EMBEDDING_CACHE_TABLE}
+                ORDER BY last_used_at ASC
+                LIMIT GREATEST((SELECT COUNT(*) FROM {EMBEDDING_CACHE_TABLE}) - %s, 0)
+            );
+        """, (max_entries,))
+        evicted = cur.rowcount
+        conn.commit()
+    with cache_lock:
+        cache_stats["evicted"] += evicted
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that looks texts up in a persistent Postgres cache
+    keyed by (model, dimensions, sha256(text)) before calling the wrapped embedder.
+    """
+    def __init__(self, embedder: Embeddings, model: str, dimensions: int):
+        self.embedder = embedder
+        self.model = model
+        self.dimensions = dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        ensure_embedding_cache_table()
+        hashes = [hash_text(text) for text in texts]
+        cached = self.lookup(list(set(hashes)))
+
+        # Embed each missing text once, even if it repeats in the batch
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+        if missing:
+            vectors = self.embedder.embed_documents(list(missing.values()))
+            new_entries = dict(zip(missing.keys(), vectors))
+            self.store(new_entries)
+            cached.update(new_entries)
+
+        with cache_lock:
+            cache_stats["misses"] += len(missing)
+            cache_stats["hits"] += len(texts) - len(missing)
+
+        return [list(cached[text_hash]) for text_hash in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        # Questions are one-off texts on the chat hot path, only document and row embeddings are cached
+        return self.embedder.embed_query(text)
+
+    def lookup(self, hashes: List[str]) -> dict:
+        """Returns {text_hash: embedding} for the cached hashes and marks them used"""
+        with postgres_var.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                UPDATE {EMBEDDING_CACHE_TABLE} SET last_used_at = now()
+                WHERE model = %s AND dimensions = %s AND text_hash = ANY(%s)
+                RETURNING text_hash, embedding;
+            """, (self.model, self.dimensions, hashes))
+            cached = {text_hash: embedding for text_hash, embedding in cur.fetchall()}
+            conn.commit()
+        return cached
+
+    def store(self, entries: dict):
+        """Inserts new {text_hash: embedding} entries, evicting old ones when the cache is full"""
+        with postgres_var.connection() as conn, conn.cursor() as cur:
+            execute_values(cur, f"""
+                INSERT INTO {EMBEDDING_CACHE_TABLE} (model, dimensions, text_hash, embedding)
+                VALUES %s
+                ON CONFLICT (model, dimensions, text_hash) DO NOTHING;
+            """, [(self.model, self.dimensions, text_hash, embedding) for text_hash, embedding in entries.items()])
+            conn.commit()
+
+        with cache_lock:
+            cache_state["inserts_since_eviction"] += len(entries)
+            run_eviction = cache_state["inserts_since_eviction"] >= ingest_var.embedding_cache_evict_every
+            if run_eviction:
+                cache_state["inserts_since_eviction"] = 0
+        if run_eviction:
+            evict_embedding_cache(ingest_var.embedding_cache_max_entries)
@@ -0,0 +1,144 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator, Optional
+import openai
+from rich import print as rprint
+from config import ingest_var
+from llm_core.langgraph.utilities.embedding_utils import count_tokens
+
+
+def rebatch(batches: Iterable[list], batch_size: int) -> Iterator[list]:
+    """Regroup an iterable of batches into batches of batch_size items"""
+    items = chain.from_iterable(batches)
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check if an embedding error is a throttling response"""
+    if isinstance(error, openai.RateLimitError):
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message or "too many requests" in message
+
+
+class AdaptiveThrottle:
+    """
+    Delay shared by all embedding workers.
+    Doubles on every rate-limit error and halves on every success.
+    """
+    def __init__(self, base_delay: float, max_delay: float):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            delay = self.delay
+        if delay:
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def throttled(self):
+        with self.lock:
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+
+    def succeeded(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay > self.base_delay / 8 else 0.0
+
+
+def write_embedding_batches(batches: Iterable[list],
+                            write_batch: Callable[[list], None],
+                            text_of: Callable[[Any], str],
+                            on_checkpoint: Optional[Callable[[Any], None]] = None,
+                            label: str = "embeddings") -> dict:
+    """
+    Runs write_batch over every batch with bounded concurrency.
+
+    - At most EMBEDDING_CONCURRENCY batches are in flight; batches are pulled lazily.
+    - A failed batch is retried up to EMBEDDING_MAX_RETRIES times with exponential backoff.
+    - Rate-limit errors also slow every worker down through a shared adaptive delay.
+    - on_checkpoint is called with the last item of the newest batch once it and all
+      earlier batches have been written, so a rerun can resume after it.
+    - Raises the batch error once retries are exhausted.
+
+    Returns throughput metrics (rows, tokens, rows/s, tokens/s, retries).
+    """
+    concurrency = max(1, ingest_var.embedding_concurrency)
+    throttle = AdaptiveThrottle(ingest_var.embedding_backoff_base, ingest_var.embedding_backoff_max)
+    stats = {"rows": 0, "batches": 0, "tokens": 0, "retries": 0, "throttled": 0}
+    stats_lock = threading.Lock()
+    start = time.monotonic()
+
+    def run_batch(batch: list):
+        attempt = 0
+        while True:
+            throttle.wait()
+            try:
+                write_batch(batch)
+                throttle.succeeded()
+                break
+            except Exception as e:
+                attempt += 1
+                rate_limited = is_rate_limit_error(e)
+                with stats_lock:
+                    stats["retries"] += 1
+                    stats["throttled"] += int(rate_limited)
+                if attempt > ingest_var.embedding_max_retries:
+                    raise
+                if rate_limited:
+                    throttle.throttled()
+                backoff = min(ingest_var.embedding_backoff_max, ingest_var.embedding_backoff_base * 2 ** (attempt - 1))
+                backoff *= random.uniform(0.5, 1.0)
+                rprint(f"{label}: batch of {len(batch)} failed ({str(e)}), retry {attempt}/{ingest_var.embedding_max_retries} in {backoff:.1f}s")
+                time.sleep(backoff)
+
+        tokens = sum(count_tokens(text_of(item)) for item in batch)
+        with stats_lock:
+            stats["rows"] += len(batch)
+            stats["batches"] += 1
+            stats["tokens"] += tokens
+
+    pending = {}
+    completed = {}
+    next_index = 0
+
+    def collect(finished):
+        nonlocal next_index
+        for future in finished:
+            index, last_item = pending.pop(future)
+            future.result()
+            completed[index] = last_item
+
+        checkpoint = None
+        while next_index in completed:
+            checkpoint = completed.pop(next_index)
+            next_index += 1
+        if checkpoint is not None and on_checkpoint:
+            on_checkpoint(checkpoint)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed") as executor:
+        for index, batch in enumerate(batches):
+            if len(pending) >= concurrency:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending[executor.submit(run_batch, batch)] = (index, batch[-1])
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(finished)
+
+    elapsed = time.monotonic() - start
+    stats["elapsed"] = elapsed
+    stats["rows_per_second"] = stats["rows"] / elapsed if elapsed else 0.0
+    stats["tokens_per_second"] = stats["tokens"] / elapsed if elapsed else 0.0
+    rprint(f"{label}: {stats['rows']} rows in {elapsed:.1f}s "
+           f"({stats['rows_per_second']:.1f} rows/s, {stats['tokens_per_second']:.1f} tokens/s, "
+           f"{stats['retries']} retries, {stats['throttled']} throttled)")
+    return stats
@@ -1,10 +1,16 @@
+from functools import lru_cache
+from typing import Optional
+import tiktoken
 from langchain_openai import OpenAIEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config import openai_var
+from config import openai_var, ingest_var, embedding_var
+from llm_core.langgraph.utilities.embedding_cache import CachedEmbeddings
+from llm_core.langgraph.utilities.local_embeddings import HashingEmbeddings
+from utilities.store_registry import StoreRegistry
 
 
-def get_embedder(dimensions: int):
-    """Get the embeddinf model"""
+def get_openai_embedder(dimensions: int):
+    """Get the OpenAI embedding model, backed by the persistent embedding cache when enabled"""
     embedder = OpenAIEmbeddings(
         openai_api_key=openai_var.openai_api_key,
         openai_api_base=openai_var.openai_endpoint,
@@ -12,8 +18,27 @@ def get_embedder(dimensions: int):
         dimensions=dimensions
     )
 
+    if ingest_var.embedding_cache:
+        return CachedEmbeddings(embedder, openai_var.openai_embedding_modal_small, dimensions)
     return embedder
 
+
+# Local providers are cheap to recompute, so only remote ones go through the cache
+EMBEDDING_PROVIDERS = {
+    "openai": get_openai_embedder,
+    "hashing": HashingEmbeddings,
+}
+
+embedders = StoreRegistry("embedders")
+
+
+def get_embedder(dimensions: int, provider: Optional[str] = None):
+    """Get the shared embedding model of the configured provider (EMBEDDING_PROVIDER)"""
+    provider = provider or embedding_var.embedding_provider
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{provider}', expected one of {', '.join(EMBEDDING_PROVIDERS)}")
+    return embedders.get_or_create((provider, dimensions), lambda: EMBEDDING_PROVIDERS[provider](dimensions))
+
 def recur_text_splitter(chunk_size=400, chunk_overlap=40, length_function=len, is_separator_regex=False):
     recur_text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
@@ -21,4 +46,31 @@ def recur_text_splitter(chunk_size=400, chunk_overlap=40, length_function=len, i
         length_function=length_function,
         is_separator_regex=is_separator_regex,)
     
-    return recur_text_splitter
\ No newline at end of file
+    return recur_text_splitter
+
+
+# Average characters per cl100k_base token in English text
+APPROX_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_token_encoding():
+    """
+    Get the tokenizer used by the OpenAI embedding models, None with TOKEN_COUNTER=approximate
+    or when its encoding file cannot be loaded (tiktoken downloads it on first use).
+    """
+    if embedding_var.token_counter != "tiktoken":
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Could not load the cl100k_base encoding, approximating token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in a text, approximately when the tokenizer is unavailable"""
+    encoding = get_token_encoding()
+    if encoding is None:
+        return -(-len(text) // APPROX_CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,53 @@
+import re
+import hashlib
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=262144)
+def hash_feature(feature: str, dimensions: int) -> Tuple[int, float]:
+    """Returns the bucket and sign a feature is hashed to"""
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dimensions, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic local embedder based on the hashing trick.
+    Lowercased word unigrams and bigrams are hashed into signed buckets,
+    log-scaled and L2-normalised, so texts sharing words get similar vectors
+    without a model download or any network access.
+    """
+    model = "hashing-v1"
+
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def features(self, text: str) -> List[str]:
+        """Returns the word unigrams and bigrams of a text"""
+        words = TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                col, sign = hash_feature(feature, self.dimensions)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+
+        # Scatter every feature of the batch at once, then scale and normalise row-wise
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), np.array(signs, dtype=np.float32))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return matrix.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -106,7 +106,6 @@ async def safe_send(active_websockets, message: MessageInstance, session_id: str
     try:
         websocket = active_websockets[session_id]
     except KeyError:
-        rprint(websocket.client_state)
         logging.warning("Attempted to send a message on a closed WebSocket.")
         return
     
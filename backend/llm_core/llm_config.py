@@ -15,4 +15,18 @@ class LoadOpenAIConfig:
         self.openai_endpoint = os.getenv('OPENAI_BASE_URL')
         self.openai_model = os.getenv('OPENAI_MODEL_NAME')
         self.openai_embedding_model = os.getenv('OPENAI_EMB_MODEL')
-        self.openai_embedding_modal_small = os.getenv('OPENAI_EMB_MODEL_SMALL')
\ No newline at end of file
+        self.openai_embedding_modal_small = os.getenv('OPENAI_EMB_MODEL_SMALL')
+
+
+class LoadEmbeddingConfig:
+    """
+    Configuration class for the embedding provider.
+    """
+    def __init__(self):
+        """
+        Initializes the configuration for the embedding provider.
+        """
+        self.embedding_provider = os.getenv('EMBEDDING_PROVIDER', 'openai').lower()    # openai or hashing (local, offline)
+        # tiktoken downloads its encoding on first use, so offline setups approximate token counts
+        default_token_counter = 'approximate' if self.embedding_provider == 'hashing' else 'tiktoken'
+        self.token_counter = os.getenv('TOKEN_COUNTER', default_token_counter).lower()  # tiktoken or approximate (offline)
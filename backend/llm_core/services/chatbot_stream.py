@@ -256,7 +256,7 @@ async def handle_on_chain_start(
                     # rprint("Table: ", input_data['table_name'], "Query: ", input_data['answer_retrieval_query'],"role: ", role)
                     if input_data['query_failed'] is False:
                         # rprint("Condition 2")
-                        message_str = sql_agent_function(table_name=input_data['table_name'], query=input_data['answer_retrieval_query'], role=role, query_type=query_type)
+                        message_str = await sql_agent_function(table_name=input_data['table_name'], query=input_data['answer_retrieval_query'], role=role, query_type=query_type)
                         end_message = await query_agent_stream(chatbot, 
                                                                session_id, 
                                                                " <br><br> Query: " + input_data['answer_retrieval_query'] + "<br><br> Query Result: <br>" + message_str["Result"], 
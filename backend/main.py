@@ -4,6 +4,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from dotenv import load_dotenv
 from routers.routes import router
+from config import postgres_var, neo4j_var
+from db.document.neo4j_retrieval import pdf_vector_stores
+from services.pdf_document_formatter import shutdown_parse_pool
 
 load_dotenv()
 
@@ -34,6 +37,15 @@ app.state.task_registry = {}
 
 app.include_router(router)
 
+
+@app.on_event("shutdown")
+async def close_connection_pools():
+    postgres_var.close_pool()
+    await postgres_var.close_async_pool()
+    pdf_vector_stores.clear()
+    shutdown_parse_pool()
+    neo4j_var.close_driver()
+
 @app.get("/set-session")
 async def set_session(request: Request):
     request.session["user_data"] = {"name": "John Doe", "role": "admin"}
@@ -11,6 +11,8 @@ class TableNameRequest(BaseModel):
     table_name: Optional[str] = None
     page: Optional[int] = 1
     page_size: Optional[int] = 10 
+    cursor: Optional[str] = None            # next_cursor/prev_cursor of a previous page, overrides page
+    exact_count: Optional[bool] = False     # count every row instead of using the cached count or planner estimate
 
 
 class PdfNameRequest(BaseModel):
@@ -1,51 +1,106 @@
 from fastapi import APIRouter, HTTPException, File, UploadFile, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import asyncio
 from starlette.status import HTTP_401_UNAUTHORIZED
 from rich import print as rprint
 
 # import tabular db functions
-from db.tabular.insert_table import ingest_csv_into_postgres
-from db.tabular.table_operations import run_query, get_table_data, delete_table, get_table_names_from_db
-from db.tabular.insert_pdf_record import ingest_pdf_into_postgres
+from db.tabular.insert_table import ingest_csv_into_postgres, handle_csv_upload
+from db.tabular.table_operations import run_query, stream_query, get_table_data, delete_table, get_table_names_from_db
+from db.tabular.insert_pdf_record import ingest_pdf_into_postgres, handle_pdf_upload
 from db.tabular.pdf_record_operations import get_pdf_names_from_db, get_pdf_data
+from db.tabular.table_embeddings import invalidate_table_stores
+from db.document.neo4j_retrieval import invalidate_pdf_retrievers
+from db.document.neo4j_schema import get_kg_schema_report
 
 # import os and task related functions
 from utilities.os_re_tools import remove_file_extension, set_abs_path, if_path_exists
 from utilities.authorization import verify_session
 from llm_core.utilities.chatbot_utilities import get_chatbot_manager
 from services.tasks import delete_task_table
+from services.jobs import create_job, update_job, get_job, submit_job
 from models.models import TableNameRequest, PdfNameRequest
 
 # import llm related functions
 from llm_core.services.chatbot_stream import run_chatbots, active_websockets, tasks, message_queue
 from llm_core.langgraph.models.models import MessageInstance
+from llm_core.langgraph.utilities.utility_function import safe_send
+from llm_core.langgraph.utilities.embedding_cache import get_embedding_cache_stats
+from db.tabular.query_cache import get_query_cache_stats
+from config import postgres_var
 
 
 router = APIRouter()
 
-@router.post("/upload", status_code=200)
-async def upload_file(file: UploadFile = File(...)):
+def ingest_progress_listener(loop: asyncio.AbstractEventLoop, session_id: str, file_type: str):
     """
-    Ingests a PDF or CSV file into a PostgreSQL table.
-    ingest_csv_into_postgres stores file, adds csv to table and creats/stores embeddings in vector store
-    ingest_pdf_into_postgres stores file, adds pdf file location to table and creates/stores embeddings in neo4j
+    Returns a job listener that pushes ingestion progress to the session's websocket.
+    Job updates arrive from ingest worker threads, so sends are scheduled on the server loop.
+    """
+    def listener(job: dict):
+        message = MessageInstance(
+            event="on_ingest_progress",
+            message=job["stage"],
+            table_name=job["name"] if file_type == "csv" else None,
+            pdf_name=job["name"] if file_type == "pdf" else None,
+            job_id=job["job_id"],
+            job_status=job["status"],
+        )
+        asyncio.run_coroutine_threadsafe(safe_send(active_websockets, message, session_id), loop)
+
+    return listener
+
+
+@router.post("/upload", status_code=202)
+async def upload_file(request: Request, file: UploadFile = File(...)):
+    """
+    Saves a PDF or CSV file and queues it for ingestion. Returns the ingestion job.
+    ingest_csv_into_postgres adds csv to table and creats/stores embeddings in vector store
+    ingest_pdf_into_postgres adds pdf file location to table and creates/stores embeddings in neo4j
+    Stage progress is served by /upload-status/{job_id} and pushed over the chat websocket.
     """
     if file.filename.endswith('.csv'):
-        ingest_csv_into_postgres(file)
+        file_type = "csv"
+        name, file_location = await run_in_threadpool(handle_csv_upload, file)
+        ingest_func = ingest_csv_into_postgres
     else:
-        ingest_pdf_into_postgres(file)
+        file_type = "pdf"
+        name, file_location = await run_in_threadpool(handle_pdf_upload, file)
+        ingest_func = ingest_pdf_into_postgres
+
+    session_id = request.session.get("user_data", {}).get("name")
+    listener = ingest_progress_listener(asyncio.get_running_loop(), session_id, file_type) if session_id else None
+
+    job = create_job(file.filename, file_type, name, listener)
+    update_job(job["job_id"], stage="saved")
+    submit_job(job["job_id"], ingest_func, name, file_location)
+
+    return get_job(job["job_id"])
+
+
+@router.get("/upload-status/{job_id}", status_code=200)
+async def upload_status(job_id: str):
+    """
+    Returns the status and completed stages of an ingestion job.
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
 
 
 @router.delete("/delete-file", status_code=204)
-async def delete_table(table: TableNameRequest , request: Request):
+async def delete_file(table: TableNameRequest , request: Request):
     """
     Deletes a table from the database.
     Does not delete embeddings from vector store
     """
     table_name = table.table_name
     delete_task_table(table_name)
-    delete_table(table_name)
+    await delete_table(table_name)
+    invalidate_table_stores(table_name)
+    invalidate_pdf_retrievers(table_name)
 
 
 @router.get("/get-tables", status_code=200)
@@ -54,7 +109,7 @@ async def get_table_files(request: Request):
     Returns a list of table names from the database.
     """
     try:
-        table_names = get_table_names_from_db()
+        table_names = await get_table_names_from_db()
         return table_names
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
@@ -67,7 +122,7 @@ async def get_pdf_files(request: Request):
     Returns a list of pdf names from the database.
     """
     try:
-        table_content = get_pdf_names_from_db()
+        table_content = await get_pdf_names_from_db()
         return table_content
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
@@ -99,9 +154,11 @@ async def get_table(table: TableNameRequest, request: Request):
     else:
         # handles when user selects table
         try:
-            table_data = get_table_data(table_name, page, page_size)
+            table_data = await get_table_data(table_name, page, page_size, table.cursor, table.exact_count)
             await manager.set_table(session['name'], table_name)
             return table_data
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             raise HTTPException(status_code=500, detail="An unexpected error occurred.")
@@ -128,7 +185,7 @@ async def set_pdf_route(pdf_name: PdfNameRequest, request: Request):
     else:
         # handles when user selects pdf
         try:
-            file_name_minus_extension = remove_file_extension(get_pdf_data(pdf_name.pdf_name))
+            file_name_minus_extension = remove_file_extension(await get_pdf_data(pdf_name.pdf_name))
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             raise HTTPException(status_code=500, detail="An unexpected error occurred.")
@@ -149,7 +206,7 @@ async def get_pdf(pdf_name: str, request: Request):
         print(f"Unexpected error in WebSocket endpoint: {e}")
 
     try:
-        file_name = get_pdf_data(pdf_name)
+        file_name = await get_pdf_data(pdf_name)
     except Exception as e:
         print(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
@@ -232,11 +289,74 @@ async def sql_query(request: Request):
 
     try:
         body = await request.json()
-        result = run_query(body['table_name'], body['query'], body['role'], body['query_type'])
-        rprint(result)
+        result = await run_query(body['table_name'], body['query'], body['role'], body['query_type'])
+        rprint(f"sql-query on {body['table_name']} returned {len(result)} rows")
         return JSONResponse(content={"success": True, "data": result})
 
     except Exception as e:
         rprint(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
+
+@router.post("/sql-query/stream")
+async def sql_query_stream(request: Request):
+    """
+    Streams the rows of a retrieval query as NDJSON instead of one JSON response.
+    The last line is {"stats": {"rows", "truncated", "first_row_ms", "elapsed_ms"}},
+    with "error" added if the query failed mid-stream.
+    Body: table_name, query and an optional max_rows below SQL_STREAM_MAX_ROWS.
+    """
+    try: 
+        session = await verify_session(request)
+    except Exception as e:
+        raise HTTPException(status_code=401, detail="Invalid session")
+
+    body = await request.json()
+    if body.get('query_type', 'retrieval') != 'retrieval':
+        raise HTTPException(status_code=400, detail="Only retrieval queries can be streamed.")
+
+    try:
+        lines = await stream_query(body['table_name'], body['query'], body.get('max_rows'))
+    except HTTPException:
+        raise
+    except Exception as e:
+        rprint(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get("/embedding-cache-stats", status_code=200)
+async def embedding_cache_stats():
+    """
+    Returns embedding cache hit/miss counters and hit rate for this process.
+    """
+    return get_embedding_cache_stats()
+
+
+@router.get("/query-cache-stats", status_code=200)
+async def query_cache_stats():
+    """
+    Returns SQL query result cache hit/miss counters and hit rate for this process.
+    """
+    return get_query_cache_stats()
+
+
+@router.get("/pool-stats", status_code=200)
+async def pool_stats():
+    """
+    Returns Postgres connection pool sizing and checkout wait metrics for this process.
+    """
+    return {"sync": postgres_var.get_pool_stats(), "async": postgres_var.get_async_pool_stats()}
+
+
+@router.get("/kg-schema-report", status_code=200)
+async def kg_schema_report():
+    """
+    Returns the knowledge graph indexes and constraints that are missing or not online.
+    """
+    try:
+        return await run_in_threadpool(get_kg_schema_report)
+    except Exception as e:
+        print(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
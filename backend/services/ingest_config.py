@@ -0,0 +1,55 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class LoadIngestConfig:
+    """
+    Configuration class for file ingestion.
+    """
+    def __init__(self):
+        """
+        Initializes the configuration for file ingestion.
+        """
+        self.ingest_workers = int(os.getenv('INGEST_WORKERS', 2))                   # uploads ingested at once
+        self.ingest_job_retention = int(os.getenv('INGEST_JOB_RETENTION', 200))     # finished jobs kept for status lookups
+
+        # CSV ingestion
+        self.csv_streaming_ingest = os.getenv('CSV_STREAMING_INGEST', 'true').lower() == 'true'   # one-pass batched COPY instead of a full pandas read
+        self.csv_schema_sample_rows = int(os.getenv('CSV_SCHEMA_SAMPLE_ROWS', 1000))              # rows read to infer column types
+        self.csv_copy_batch_rows = int(os.getenv('CSV_COPY_BATCH_ROWS', 10000))                   # rows buffered per COPY batch
+
+        # Embeddings
+        self.row_fetch_size = int(os.getenv('ROW_EMBEDDING_FETCH_SIZE', 1000))          # rows fetched per server-side cursor batch
+        self.embedding_batch_size = int(os.getenv('EMBEDDING_BATCH_SIZE', 256))         # texts sent per embedding request
+        self.embedding_concurrency = int(os.getenv('EMBEDDING_CONCURRENCY', 4))         # embedding requests in flight
+        self.embedding_max_retries = int(os.getenv('EMBEDDING_MAX_RETRIES', 5))         # retries per batch before the ingest fails
+        self.embedding_backoff_base = float(os.getenv('EMBEDDING_BACKOFF_BASE', 1.0))   # seconds, first retry delay
+        self.embedding_backoff_max = float(os.getenv('EMBEDDING_BACKOFF_MAX', 60.0))    # seconds, retry delay cap
+        self.embedding_cache = os.getenv('EMBEDDING_CACHE', 'true').lower() == 'true'          # reuse embeddings of previously seen texts
+        self.embedding_cache_max_entries = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', 1000000))  # cached embeddings kept before LRU eviction
+        self.embedding_cache_evict_every = int(os.getenv('EMBEDDING_CACHE_EVICT_EVERY', 10000))    # inserts between eviction checks
+
+        # Vector indexes
+        self.vector_index_type = os.getenv('VECTOR_INDEX_TYPE', 'hnsw').lower()        # hnsw, ivfflat or none (exact scan)
+        self.hnsw_m = int(os.getenv('HNSW_M', 16))                                      # graph links per node
+        self.hnsw_ef_construction = int(os.getenv('HNSW_EF_CONSTRUCTION', 64))          # candidate list size while building
+        self.hnsw_ef_search = int(os.getenv('HNSW_EF_SEARCH', 40))                      # candidate list size per query, higher is better recall
+        self.ivfflat_lists = int(os.getenv('IVFFLAT_LISTS', 0))                         # 0 picks rows/1000 (sqrt(rows) above 1M rows)
+        self.ivfflat_probes = int(os.getenv('IVFFLAT_PROBES', 10))                      # lists scanned per query, higher is better recall
+        self.pdf_retrieval_filter = os.getenv('PDF_RETRIEVAL_FILTER', 'prefilter').lower()   # prefilter (exact, per document) or postfilter (ANN then filter)
+        self.pdf_retrieval_candidates = int(os.getenv('PDF_RETRIEVAL_CANDIDATES', 50))       # postfilter: nearest chunks fetched before filtering by document
+        self.pdf_context_mode = os.getenv('PDF_CONTEXT_MODE', 'section').lower()             # section (whole matched section) or window (chunks around the match)
+        self.pdf_context_token_budget = int(os.getenv('PDF_CONTEXT_TOKEN_BUDGET', 800))      # window: tokens of context around the matched chunk
+        self.pdf_context_paragraph_radius = int(os.getenv('PDF_CONTEXT_PARAGRAPH_RADIUS', 3))  # window: NEXT_PARAGRAPH hops searched either side
+
+        # PDF parsing
+        self.pdf_parse_mode = os.getenv('PDF_PARSE_MODE', 'document').lower()        # document (single pass) or page (pymupdf4llm run per page)
+        self.pdf_parse_workers = int(os.getenv('PDF_PARSE_WORKERS', 1))               # parsing processes, 1 parses in the ingest thread
+        self.pdf_parse_shard_pages = int(os.getenv('PDF_PARSE_SHARD_PAGES', 25))      # pages per parallel parsing task
+
+        # Knowledge graph
+        self.neo4j_write_batch_size = int(os.getenv('NEO4J_WRITE_BATCH_SIZE', 1000))  # rows per UNWIND write transaction
+        self.kg_build_mode = os.getenv('KG_BUILD_MODE', 'bulk').lower()                # bulk (built in Python) or cypher (legacy passes over Block nodes)
+        self.pdf_reingest_mode = os.getenv('PDF_REINGEST_MODE', 'incremental').lower()  # incremental (changed pages only, bulk mode) or full
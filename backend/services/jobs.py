@@ -0,0 +1,112 @@
+import threading
+import time
+from uuid import uuid4
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from rich import print as rprint
+from config import ingest_var
+
+jobs: Dict[str, Dict[str, Any]] = {}
+job_listeners: Dict[str, Callable[[dict], None]] = {}
+jobs_lock = threading.Lock()
+executor = ThreadPoolExecutor(max_workers=ingest_var.ingest_workers, thread_name_prefix="ingest")
+
+
+def create_job(file_name: str, file_type: str, name: str, listener: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Registers a new ingestion job and returns a snapshot of it.
+    The listener, if given, is called with a snapshot on every update.
+    """
+    now = time.time()
+    job_id = str(uuid4())
+    with jobs_lock:
+        jobs[job_id] = {
+            "job_id": job_id,
+            "file_name": file_name,
+            "file_type": file_type,
+            "name": name,
+            "status": "queued",
+            "stage": None,
+            "completed_stages": [],
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if listener:
+            job_listeners[job_id] = listener
+        prune_finished_jobs()
+        return dict(jobs[job_id])
+
+
+def update_job(job_id: str, status: Optional[str] = None, stage: Optional[str] = None, error: Optional[str] = None,
+               result: Any = None):
+    """
+    Updates a job's status and/or stage and notifies its listener.
+    result holds what the ingest function returned, e.g. PDF page counts.
+    """
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        if status:
+            job["status"] = status
+        if stage:
+            job["stage"] = stage
+            job["completed_stages"] = job["completed_stages"] + [stage]
+        if error:
+            job["error"] = error
+        if result is not None:
+            job["result"] = result
+        job["updated_at"] = time.time()
+        snapshot = dict(job)
+        listener = job_listeners.get(job_id)
+        if status in ("completed", "failed"):
+            job_listeners.pop(job_id, None)
+
+    if listener:
+        try:
+            listener(snapshot)
+        except Exception as e:
+            rprint(f"Job listener failed for {job_id}: {str(e)}")
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """
+    Returns a snapshot of a job, or None if it is unknown.
+    """
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def submit_job(job_id: str, ingest_func: Callable, *args):
+    """
+    Runs ingest_func(*args, report_progress=...) on the bounded ingest worker pool
+    and stores its return value as the job's result.
+    """
+    def report_progress(stage: str):
+        update_job(job_id, stage=stage)
+
+    def run():
+        update_job(job_id, status="running")
+        try:
+            result = ingest_func(*args, report_progress=report_progress)
+            update_job(job_id, status="completed", result=result)
+        except Exception as e:
+            rprint(f"Ingest job {job_id} failed: {str(e)}")
+            update_job(job_id, status="failed", error=str(e))
+
+    return executor.submit(run)
+
+
+def prune_finished_jobs():
+    """
+    Drops the oldest finished jobs beyond the retention limit. Caller holds jobs_lock.
+    """
+    finished = [job for job in jobs.values() if job["status"] in ("completed", "failed")]
+    excess = len(finished) - ingest_var.ingest_job_retention
+    if excess <= 0:
+        return
+    for job in sorted(finished, key=lambda job: job["updated_at"])[:excess]:
+        del jobs[job["job_id"]]
@@ -1,9 +1,20 @@
 from utilities.os_re_tools import get_name_from_path
+import json
+import hashlib
 import pymupdf4llm
 from statistics import median
 from langchain_core.documents import Document
 from llm_core.langgraph.utilities.embedding_utils import recur_text_splitter
 from itertools import groupby
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+import pymupdf
+from config import ingest_var
+
+parse_pool_state = {"executor": None, "workers": 0}
+parse_pool_lock = threading.Lock()
 
 
 def markdown_format(page_lines, page_num):
@@ -137,6 +148,58 @@ def make_header_detector():
     return my_header_detector, returns_list
 
 
+def make_document_header_detector():
+    """ Call back function for header detection that keeps the spans of every page apart """
+    spans_by_page = defaultdict(list)
+
+    def my_header_detector(span, page=None):
+        spans_by_page[page.number].append(span)
+        return ""
+
+    return my_header_detector, spans_by_page
+
+
+def chunk_page_spans(page_spans, page_chunk, file_path, num):
+    '''
+    Turns the spans collected for one page into chunk Documents with metadata.
+    page_chunk is the page's entry of the pymupdf4llm page_chunks output.
+    '''
+    # Calculate median size
+    sizes = [span["size"] for span in page_spans if span["size"] > 0]
+    size_median = median(sizes) if sizes else 9
+
+    # Assess if line is a header and build text_array of objs
+    text_array = [span_is_header(span, size_median) for span in page_spans]
+
+    # sort by block and line
+    sorted_lines = sorted(text_array, key=lambda x: (x["block"], x["line"]))
+
+    # merge lines into their respective blocks
+    merged_blocks = []
+    for block_num, group in groupby(sorted_lines, key=lambda x: x["block"]):
+        block_lines = list(group)
+        merged_text = " ".join(line["text"] for line in block_lines)
+        is_header = any(line["is_header"] for line in block_lines)
+
+        split_sentence = merged_text.split(" ")
+        length_sentence = len(split_sentence)
+        if length_sentence >= 10:
+            is_header = False
+
+        merged_blocks.append({
+            "block": block_num,
+            "is_header": is_header,
+            "text": merged_text
+        })
+
+    intitial_md = markdown_format(merged_blocks, num)
+    
+    final_md = insert_additional_metadata(intitial_md, page_chunk, file_path, num)
+        
+    # Split markdown into chunks
+    return split_markdown_docs_into_chunks(final_md)
+
+
 def parse_and_chunk_pdf(pdf_file, file_path, page_nums=None):
     '''
     Parses and processes each page of a PDF file into structured text chunks with metadata.
@@ -149,12 +212,99 @@ def parse_and_chunk_pdf(pdf_file, file_path, page_nums=None):
     - Splits long text blocks into smaller overlapping chunks using a recursive text splitter.
     - Generates a unique block ID and chunk sequence index for each chunk.
 
+    PDF_PARSE_MODE=document walks the opened document once; page runs pymupdf4llm once per page.
+    With PDF_PARSE_WORKERS > 1, documents longer than one shard are parsed in parallel.
+
     Returns a list of LangChain Document objects, each containing a text chunk and metadata.
     '''
+    if ingest_var.pdf_parse_mode == "page":
+        return parse_and_chunk_pdf_by_page(pdf_file, file_path, page_nums)
+
+    pages = page_nums if page_nums is not None else list(range(len(pdf_file)))
+    if ingest_var.pdf_parse_workers > 1 and len(pages) > ingest_var.pdf_parse_shard_pages:
+        return parse_and_chunk_pdf_parallel(file_path, pages)
+    return parse_and_chunk_pdf_document(pdf_file, file_path, pages)
+
+
+def parse_and_chunk_pdf_document(pdf_file, file_path, page_nums=None):
+    '''
+    Single pass over the already opened document: one pymupdf4llm run collects
+    the spans of every page through the header detector, then each page is chunked.
+    '''
+    detector_func, spans_by_page = make_document_header_detector()
+    pages = page_nums if page_nums is not None else list(range(len(pdf_file)))
+
+    md_output = pymupdf4llm.to_markdown(
+        pdf_file,
+        page_chunks=True,
+        pages=pages,
+        extract_words=True,
+        hdr_info=detector_func
+    )
 
     book_array = []
+    for num, page_chunk in zip(pages, md_output):
+        book_array.extend(chunk_page_spans(spans_by_page.get(num, []), page_chunk, file_path, num))
+
+    return book_array
+
+
+def parse_page_range(file_path, pages):
+    '''
+    Process pool task: opens the PDF in the worker and parses one shard of pages.
+    '''
+    with pymupdf.open(file_path, filetype="pdf") as pdf_file:
+        return parse_and_chunk_pdf_document(pdf_file, file_path, pages)
+
+
+def get_parse_pool(workers=None):
+    '''
+    Returns the shared PDF parsing process pool, started on first use.
+    Workers are spawned rather than forked, since the server process runs threads.
+    '''
+    workers = workers or ingest_var.pdf_parse_workers
+    with parse_pool_lock:
+        executor = parse_pool_state["executor"]
+        if executor is None or parse_pool_state["workers"] != workers:
+            if executor is not None:
+                executor.shutdown(wait=False)
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            parse_pool_state.update(executor=executor, workers=workers)
+        return executor
+
+
+def shutdown_parse_pool():
+    with parse_pool_lock:
+        if parse_pool_state["executor"] is not None:
+            parse_pool_state["executor"].shutdown()
+            parse_pool_state["executor"] = None
+
 
-    for num in range(len(pdf_file)):
+def parse_and_chunk_pdf_parallel(file_path, pages, workers=None, shard_pages=None):
+    '''
+    Shards the pages into contiguous ranges of PDF_PARSE_SHARD_PAGES, parses them
+    on the process pool and concatenates the results in page order.
+    Parsing is page-local, so finalize_chunk_metadata numbers the merged list
+    exactly like the serial output.
+    '''
+    shard_pages = shard_pages or ingest_var.pdf_parse_shard_pages
+    shards = [pages[i:i + shard_pages] for i in range(0, len(pages), shard_pages)]
+    executor = get_parse_pool(workers)
+
+    book_array = []
+    for shard_chunks in executor.map(parse_page_range, [file_path] * len(shards), shards):
+        book_array.extend(shard_chunks)
+    return book_array
+
+
+def parse_and_chunk_pdf_by_page(pdf_file, file_path, page_nums=None):
+    '''
+    Legacy mode: runs pymupdf4llm on the file path once per page.
+    '''
+    book_array = []
+    pages = page_nums if page_nums is not None else range(len(pdf_file))
+
+    for num in pages:
         detector_func, page_spans = make_header_detector()
 
         # Initialize splitter tools
@@ -165,49 +315,51 @@ def parse_and_chunk_pdf(pdf_file, file_path, page_nums=None):
             extract_words=True,
             hdr_info=detector_func
         )
-        
-        # intialize structures to hold words/lines
-        text_array = []
-
-        # Calculate median size
-        sizes = [span["size"] for span in page_spans if span["size"] > 0]
-        size_median = median(sizes) if sizes else 9
-
-        # Assess if line is a header and build text_array of objs
-        text_array = [span_is_header(span, size_median) for span in page_spans]
-
-        # sort by block and line
-        sorted_lines = sorted(text_array, key=lambda x: (x["block"], x["line"]))
-
-        # merge lines into their respective blocks
-        merged_blocks = []
-        for block_num, group in groupby(sorted_lines, key=lambda x: x["block"]):
-            block_lines = list(group)
-            merged_text = " ".join(line["text"] for line in block_lines)
-            is_header = any(line["is_header"] for line in block_lines)
-
-            split_sentence = merged_text.split(" ")
-            length_sentence = len(split_sentence)
-            if length_sentence >= 10:
-                is_header = False
-
-            merged_blocks.append({
-                "block": block_num,
-                "is_header": is_header,
-                "text": merged_text
-            })
-
-        intitial_md = markdown_format(merged_blocks, num)
-        
-        final_md = insert_additional_metadata(intitial_md, md_output[0], file_path, num)
-            
-        # Split markdown into chunks
-        md_lines_chunked = split_markdown_docs_into_chunks(final_md)
-        book_array.extend(md_lines_chunked)
+
+        book_array.extend(chunk_page_spans(page_spans, md_output[0], file_path, num))
 
     return book_array
 
 
+def page_content_hash(page):
+    '''
+    Hashes what parsing depends on: the text, font size, flags and font of every span
+    in layout order. Much cheaper than parsing, so unchanged pages can be skipped.
+    '''
+    digest = hashlib.sha256()
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            for span in line["spans"]:
+                digest.update(f'{span["text"]}\x1f{span["size"]:.2f}\x1f{span["flags"]}\x1f{span["font"]}\x1e'.encode("utf-8"))
+        digest.update(b"\x1d")
+    return digest.hexdigest()
+
+
+def page_content_hashes(pdf_file):
+    '''
+    Returns {page_number: content hash} with the 1-based page numbers used in chunk metadata.
+    '''
+    return {page.number + 1: page_content_hash(page) for page in pdf_file}
+
+
+def serialize_page_chunks(chunks):
+    '''
+    Groups parsed (not yet finalized) chunks by page number and serializes each page's
+    chunks to JSON, so unchanged pages can be restored on re-ingest without parsing.
+    '''
+    pages = defaultdict(list)
+    for chunk in chunks:
+        pages[chunk.metadata['page_number']].append({"text": chunk.page_content, "metadata": chunk.metadata})
+    return {page_number: json.dumps(page_chunks) for page_number, page_chunks in pages.items()}
+
+
+def deserialize_page_chunks(page_json):
+    '''
+    Restores the chunks serialized by serialize_page_chunks for one page.
+    '''
+    return [Document(page_content=chunk["text"], metadata=chunk["metadata"]) for chunk in json.loads(page_json)]
+
+
 def finalize_chunk_metadata(processed_pdf):
     """finalizes metadata for a list of chunked PDF Document objects after initial parsing.
 
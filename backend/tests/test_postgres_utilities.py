@@ -0,0 +1,16 @@
+import pytest
+
+postgres_utilities = pytest.importorskip("db.tabular.postgres_utilities")
+
+
+def test_integer_column_widens_to_bigint_past_int32():
+    column_type = postgres_utilities.infer_postgres_type("42")
+    for value in ["2147483647", "3000000000", "-7"]:
+        column_type = postgres_utilities.widen_postgres_type(column_type, postgres_utilities.infer_postgres_type(value))
+    assert column_type == "BIGINT"
+
+
+def test_bigint_column_is_reported_as_number():
+    # information_schema reports BIGINT columns as "bigint"
+    columns = postgres_utilities.convert_postgres_to_react([("id", "integer"), ("views", "bigint")])
+    assert columns == [("id", "number"), ("views", "number")]
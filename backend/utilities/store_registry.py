@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+
+class StoreRegistry:
+    """
+    Keyed cache of long-lived objects (vector stores, retrievers, embedders, ids)
+    so request handlers stop paying their setup round-trips on every call.
+
+    - get_or_create builds a missing entry once, outside the registry lock; concurrent
+      callers for the same key wait for that build, other keys are not blocked.
+    - Entries beyond max_entries are evicted least recently used first.
+    - on_evict is called with every evicted or invalidated value, e.g. to close a driver.
+    """
+    def __init__(self, name: str, max_entries: int = 256, on_evict: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.entries[key]
+
+            build = self.pending.get(key)
+            if build is None:
+                self.stats["misses"] += 1
+                build = self.pending[key] = Future()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            # Raises the builder's exception if its build failed
+            return build.result()
+
+        try:
+            value = factory()
+        except BaseException as e:
+            with self.lock:
+                if self.pending.get(key) is build:
+                    del self.pending[key]
+            build.set_exception(e)
+            raise
+
+        evicted = []
+        with self.lock:
+            # An entry invalidated while it was being built is not stored
+            if self.pending.get(key) is build:
+                del self.pending[key]
+                self.entries[key] = value
+                while len(self.entries) > self.max_entries:
+                    evicted.append(self.entries.popitem(last=False)[1])
+                    self.stats["evicted"] += 1
+        build.set_result(value)
+
+        for old_value in evicted:
+            self.close(old_value)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns an entry without creating it, for values that are built asynchronously"""
+        with self.lock:
+            if key not in self.entries:
+                self.stats["misses"] += 1
+                return default
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return self.entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        """Sets an entry, replacing (and closing) any previous value"""
+        with self.lock:
+            old_value = self.entries.pop(key, None)
+            self.pending.pop(key, None)
+            self.entries[key] = value
+            evicted = []
+            while len(self.entries) > self.max_entries:
+                evicted.append(self.entries.popitem(last=False)[1])
+                self.stats["evicted"] += 1
+
+        for stale in ([old_value] if old_value is not None else []) + evicted:
+            self.close(stale)
+
+    def invalidate(self, key: Hashable):
+        """Drops one entry"""
+        with self.lock:
+            value = self.entries.pop(key, None)
+            self.pending.pop(key, None)
+        if value is not None:
+            self.close(value)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Drops every entry whose key matches predicate"""
+        with self.lock:
+            keys = [key for key in self.entries if predicate(key)]
+            values = [self.entries.pop(key) for key in keys]
+            for key in [key for key in self.pending if predicate(key)]:
+                del self.pending[key]
+        for value in values:
+            self.close(value)
+
+    def clear(self):
+        self.invalidate_where(lambda key: True)
+
+    def close(self, value: Any):
+        if self.on_evict is None:
+            return
+        try:
+            self.on_evict(value)
+        except Exception as e:
+            print(f"Error closing {self.name} entry: {str(e)}")
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {**self.stats, "entries": len(self.entries)}
@@ -5,8 +5,9 @@ import { useFileSidePanelOperations } from '../hooks/useFileSidePanelOperations'
 const UploadWindow: React.FC = () => {
   const [file, setFile] = useState<File | null>(null);
   const [errorMsg, setErrorMsg] = useState<string>('');
+  const [statusMsg, setStatusMsg] = useState<string>('');
   const fileInputRef = useRef<HTMLInputElement>(null);
-  const { addFileToDatabase, loadTablesFromDatabase, loadPdfsFromDatabase } = useFileSidePanelOperations();
+  const { addFileToDatabase, waitForIngestJob, loadTablesFromDatabase, loadPdfsFromDatabase } = useFileSidePanelOperations();
 
 
   const handleFileUpload = (event: React.ChangeEvent<HTMLInputElement>) => {
@@ -29,12 +30,21 @@ const UploadWindow: React.FC = () => {
 
     try {
 
-      await addFileToDatabase(file);
+      // Upload returns before ingestion runs, the lists are reloaded once the job finishes
+      const job = await addFileToDatabase(file);
+      resetFileInput();
+      const finishedJob = await waitForIngestJob(job.job_id, (progress) =>
+        setStatusMsg(`Ingesting ${progress.file_name}: ${progress.stage ?? progress.status}`)
+      );
+      setStatusMsg('');
       await loadTablesFromDatabase();
       await loadPdfsFromDatabase();
-      resetFileInput();
+      if (finishedJob.status === 'failed') {
+        setErrorMsg(`Error ingesting ${finishedJob.file_name}`);
+      }
 
     } catch (error) {
+      setStatusMsg('');
       setErrorMsg('Error uploading file');
     }
   };
@@ -52,6 +62,7 @@ const UploadWindow: React.FC = () => {
           Upload
         </button>
       </div>
+      {statusMsg && <p className="status-message">{statusMsg}</p>}
       {errorMsg && <p className="error-message" style={{ color: 'red' }}>{errorMsg}</p>}
     </div>
   );
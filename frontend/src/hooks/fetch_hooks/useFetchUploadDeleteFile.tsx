@@ -26,6 +26,24 @@ export const useFetchUploadDeleteFile = () => {
     []
   );
 
+  const fetchUploadStatus = useCallback(
+    async (jobId: string): Promise<any> => {
+      try {
+        const response = await fetch(`http://localhost:8000/upload-status/${jobId}`);
+
+        if (response.ok) {
+          return await response.json();
+        } else {
+          throw new Error('Error fetching upload status');
+        }
+      } catch (error) {
+        console.error('Error fetching upload status:', error);
+        throw error;
+      }
+    },
+    []
+  );
+
   const fetchDeleteFile = useCallback(
     async (tableName: string) => {
       try {
@@ -50,5 +68,5 @@ export const useFetchUploadDeleteFile = () => {
     []
   );
 
-  return { fetchUploadFile, fetchDeleteFile };
+  return { fetchUploadFile, fetchUploadStatus, fetchDeleteFile };
 };
@@ -16,12 +16,13 @@ export const useFileSidePanelOperations = () => {
 
   // Fetch functions
   const { fetchSetPdfData, fetchTableData, fetchPdfs, fetchTables } = useFetchDataDatabase();
-  const { fetchUploadFile, fetchDeleteFile } = useFetchUploadDeleteFile();
+  const { fetchUploadFile, fetchUploadStatus, fetchDeleteFile } = useFetchUploadDeleteFile();
 
 
+  // Returns the ingestion job; the upload is ingested in the background
   const addFileToDatabase = async (file: File) => {
     try {
-      const data = await fetchUploadFile(file);
+      return await fetchUploadFile(file);
 
     } catch (error) {
       console.error('Error adding table:', error);
@@ -30,6 +31,19 @@ export const useFileSidePanelOperations = () => {
   };
 
 
+  // Polls an ingestion job until it completes or fails, reporting each stage
+  const waitForIngestJob = async (jobId: string, onProgress?: (job: any) => void) => {
+    while (true) {
+      const job = await fetchUploadStatus(jobId);
+      onProgress?.(job);
+      if (job.status === 'completed' || job.status === 'failed') {
+        return job;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 3000));
+    }
+  };
+
+
   const removeTableFromDatabase = async (tableName: string) => {
     try {
       await fetchDeleteFile(tableName);
@@ -166,7 +180,7 @@ export const useFileSidePanelOperations = () => {
   };
   
   
-  return {  addFileToDatabase, 
+  return {  addFileToDatabase, waitForIngestJob,
             loadTablesFromDatabase, loadPdfsFromDatabase, 
             removeTableFromDatabase, removePdfFromDatabase, 
             loadTableFromDatabase, loadPdfFromDatabase